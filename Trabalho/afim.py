@@ -0,0 +1,49 @@
+import math
+from typing import Tuple
+
+Vec2 = Tuple[float, float]
+
+# Matriz afim 2D (a, b, c, d, e, f):  x' = a*x + b*y + e ;  y' = c*x + d*y + f
+Matriz = Tuple[float, float, float, float, float, float]
+IDENTIDADE: Matriz = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def compor(m2: Matriz, m1: Matriz) -> Matriz:
+    """Matriz equivalente a aplicar m1 e depois m2."""
+    a2, b2, c2, d2, e2, f2 = m2
+    a1, b1, c1, d1, e1, f1 = m1
+    return (a2 * a1 + b2 * c1, a2 * b1 + b2 * d1,
+            c2 * a1 + d2 * c1, c2 * b1 + d2 * d1,
+            a2 * e1 + b2 * f1 + e2, c2 * e1 + d2 * f1 + f2)
+
+
+def aplicar_matriz(m: Matriz, x: float, y: float) -> Vec2:
+    a, b, c, d, e, f = m
+    return a * x + b * y + e, c * x + d * y + f
+
+
+def fator_escala(m: Matriz) -> float:
+    """Fator de escala médio da parte linear (raiz do |determinante|)."""
+    a, b, c, d, _, _ = m
+    return math.sqrt(abs(a * d - b * c))
+
+
+def _em_torno(m: Matriz, pivot: Vec2) -> Matriz:
+    """Conjuga a parte linear de m com translações para usar `pivot` como origem."""
+    px, py = pivot
+    a, b, c, d, _, _ = m
+    return (a, b, c, d, px - a * px - b * py, py - c * px - d * py)
+
+
+def matriz_translacao(dx: float, dy: float) -> Matriz:
+    return (1.0, 0.0, 0.0, 1.0, dx, dy)
+
+
+def matriz_rotacao(angulo_graus: float, pivot: Vec2 = (0.0, 0.0)) -> Matriz:
+    ang = math.radians(angulo_graus)
+    cos_a, sin_a = math.cos(ang), math.sin(ang)
+    return _em_torno((cos_a, -sin_a, sin_a, cos_a, 0.0, 0.0), pivot)
+
+
+def matriz_escala(fator: float, pivot: Vec2 = (0.0, 0.0)) -> Matriz:
+    return _em_torno((fator, 0.0, 0.0, fator, 0.0, 0.0), pivot)
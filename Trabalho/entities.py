@@ -1,214 +1,560 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Tuple, Callable
+import copy
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Dict, List, Tuple, Callable
 import math
 import pygame as pg
 
+from afim import (IDENTIDADE, Matriz, aplicar_matriz, compor, fator_escala, matriz_escala, matriz_rotacao,
+                  matriz_translacao)
+from rasterizacao import (Spans, contem_pixel, desenhar_spans, spans_bresenham, spans_circunferencia,
+                          spans_dda, spans_preenchimento, unir_spans)
+from simplificacao import simplificar
+
 Vec2 = Tuple[float, float]
 Color = Tuple[int, int, int]
 
 
+# Dono de pontos usados por mais de um objeto (ver _Composto)
+COMPARTILHADO = object()
+
+
 # -------------------------
 # Ponto
 # -------------------------
 @dataclass(eq=False)
 class Ponto:
-    """Representa um ponto 2D no mundo cartesiano."""
+    """Representa um ponto 2D no mundo cartesiano.
+
+    `x`, `y` são as coordenadas guardadas; se o ponto pertence a um objeto com
+    transformação pendente (`dono.matriz`), a posição efetiva é mundo().
+    """
     x: float
     y: float
+    dono: Any = field(default=None, repr=False, compare=False)
+
+    # Mutações de pontos compartilhados (dono COMPARTILHADO): só objetos
+    # `compartilhado` dependem deste contador; os demais usam a revisão do dono.
+    _revisao_compartilhada: ClassVar[int] = 0
 
-    # >>> Permite usar Ponto em set/dict pela identidade do objeto
-    def __hash__(self) -> int:
-        return object.__hash__(self)
+    # >>> Permite usar Ponto em set/dict pela identidade do objeto (slot em C, sem chamada Python)
+    __hash__ = object.__hash__
 
     def as_tuple(self) -> Tuple[float, float]:
         return (self.x, self.y)
 
+    def mundo(self) -> Vec2:
+        """Posição efetiva: (x, y) com a matriz pendente do objeto dono aplicada."""
+        m = getattr(self.dono, "matriz", IDENTIDADE)
+        if m is IDENTIDADE:
+            return (self.x, self.y)
+        return aplicar_matriz(m, self.x, self.y)
+
+    def transformar(self, m: Matriz) -> None:
+        """Aplica a matriz na posição efetiva do ponto, na hora."""
+        dono = self.dono
+        if isinstance(dono, _Composto):
+            # Mover um vértice sozinho exige a geometria do dono já consolidada
+            dono.consolidar()
+            dono._revisao += 1
+        elif dono is COMPARTILHADO:
+            Ponto._revisao_compartilhada += 1
+        self.x, self.y = aplicar_matriz(m, self.x, self.y)
+
     def translate(self, dx: float, dy: float) -> None:
-        self.x += dx
-        self.y += dy
+        self.transformar(matriz_translacao(dx, dy))
 
     def rotate(self, angle_deg: float, pivot: Vec2 = (0.0, 0.0)) -> None:
-        angle_rad = math.radians(angle_deg)
-        px, py = pivot
-        dx = self.x - px
-        dy = self.y - py
-        cos_a = math.cos(angle_rad)
-        sin_a = math.sin(angle_rad)
-        rx = dx * cos_a - dy * sin_a
-        ry = dx * sin_a + dy * cos_a
-        self.x = px + rx
-        self.y = py + ry
+        self.transformar(matriz_rotacao(angle_deg, pivot))
 
     def scale(self, factor: float, pivot: Vec2 = (0.0, 0.0)) -> None:
-        px, py = pivot
-        self.x = px + (self.x - px) * factor
-        self.y = py + (self.y - py) * factor
+        self.transformar(matriz_escala(factor, pivot))
 
     def draw(self, surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
              radius: int = 3, color: Color = (0, 0, 0), font: pg.font.Font | None = None,
              label_color: Color = (0, 0, 255)) -> None:
-        sx, sy = world_to_screen(self.x, self.y)
+        x, y = self.mundo()
+        sx, sy = world_to_screen(x, y)
         pg.draw.circle(surface, color, (sx, sy), radius)
         if font and label_color:
-            label = font.render(f"({self.x:.2f}, {self.y:.2f})", True, label_color)
+            label = font.render(f"({x:.2f}, {y:.2f})", True, label_color)
             surface.blit(label, (sx + 8, sy - 12))
 
 
+# -------------------------
+# Objetos compostos: transformação adiada
+# -------------------------
+class _Composto:
+    """Base de Reta, Circunferencia e Poligono: transformação afim adiada.
+
+    translate/rotate/scale só compõem `matriz` (O(1), sem tocar nos pontos);
+    a matriz é aplicada ao desenhar ou selecionar (Ponto.mundo) e gravada nos
+    pontos por consolidar(). Cada ponto registra o objeto dono. Um ponto usado
+    por dois objetos não pode seguir duas matrizes: os objetos envolvidos são
+    consolidados, marcados como `compartilhado` e passam a mover os pontos na hora.
+    """
+    matriz: Matriz
+    compartilhado: bool
+    _revisao: int  # muda quando as coordenadas guardadas dos pontos deste objeto mudam
+
+    def pontos(self) -> List[Ponto]:
+        raise NotImplementedError
+
+    def _copia_crua(self) -> _Composto:
+        """Cópia com pontos novos nas coordenadas guardadas e sem matriz."""
+        raise NotImplementedError
+
+    def __post_init__(self) -> None:
+        for p in self.pontos():
+            self._adotar(p)
+
+    def _adotar(self, p: Ponto) -> None:
+        dono = p.dono
+        if dono is None or dono is self:
+            p.dono = self
+            return
+        if isinstance(dono, _Composto):
+            dono.consolidar()
+            dono.compartilhado = True
+        self.consolidar()
+        self.compartilhado = True
+        self._revisao += 1
+        p.dono = COMPARTILHADO
+
+    def transformar(self, m: Matriz) -> None:
+        if self.compartilhado:
+            for p in dict.fromkeys(self.pontos()):
+                p.transformar(m)
+        else:
+            self.matriz = compor(m, self.matriz)
+
+    def translate(self, dx: float, dy: float) -> None:
+        self.transformar(matriz_translacao(dx, dy))
+
+    def rotate(self, angle_deg: float, pivot: Vec2) -> None:
+        self.transformar(matriz_rotacao(angle_deg, pivot))
+
+    def scale(self, factor: float, pivot: Vec2) -> None:
+        self.transformar(matriz_escala(factor, pivot))
+
+    def consolidar(self) -> None:
+        """Grava a matriz pendente nas coordenadas dos pontos e volta à identidade."""
+        m = self.matriz
+        if m is IDENTIDADE:
+            return
+        for p in dict.fromkeys(self.pontos()):
+            p.x, p.y = aplicar_matriz(m, p.x, p.y)
+        self.matriz = IDENTIDADE
+        self._revisao += 1
+
+    def _chave_revisao(self) -> tuple:
+        """Identifica o estado das coordenadas guardadas, para caches derivados delas."""
+        return (self._revisao, Ponto._revisao_compartilhada if self.compartilhado else 0, len(self.pontos()))
+
+    def pontos_mundo(self) -> List[Vec2]:
+        """Posições efetivas dos pontos do objeto, na ordem de pontos()."""
+        m = self.matriz
+        if m is IDENTIDADE:
+            return [(p.x, p.y) for p in self.pontos()]
+        a, b, c, d, e, f = m
+        return [(a * p.x + b * p.y + e, c * p.x + d * p.y + f) for p in self.pontos()]
+
+    def molde(self) -> Molde:
+        """Geometria base para instâncias: cópia dos pontos guardados (a matriz fica na instância).
+
+        Reaproveitada enquanto nenhum ponto deste objeto for movido, então
+        copiar o mesmo objeto várias vezes gera uma única geometria compartilhada.
+        """
+        chave = self._chave_revisao()
+        if self._molde is not None and self._molde[0] == chave:
+            return self._molde[1]
+        molde = Molde(self._copia_crua())
+        self._molde = (chave, molde)
+        return molde
+
+
 # -------------------------
 # Reta
 # -------------------------
 @dataclass
-class Reta:
+class Reta(_Composto):
     """Segmento de reta entre dois pontos."""
     p1: Ponto
     p2: Ponto
     algoritmo: str = "BRESENHAM"  # 'DDA' ou 'BRESENHAM'
+    matriz: Matriz = IDENTIDADE
+    compartilhado: bool = field(default=False, init=False, repr=False, compare=False)
+    _revisao: int = field(default=0, init=False, repr=False, compare=False)
+    _molde: tuple | None = field(default=None, init=False, repr=False, compare=False)
 
-    def translate(self, dx: float, dy: float) -> None:
-        self.p1.translate(dx, dy); self.p2.translate(dx, dy)
+    def pontos(self) -> List[Ponto]:
+        return [self.p1, self.p2]
 
-    def rotate(self, angle_deg: float, pivot: Vec2) -> None:
-        self.p1.rotate(angle_deg, pivot); self.p2.rotate(angle_deg, pivot)
+    def _copia_crua(self) -> Reta:
+        return Reta(Ponto(self.p1.x, self.p1.y), Ponto(self.p2.x, self.p2.y), self.algoritmo)
 
-    def scale(self, factor: float, pivot: Vec2) -> None:
-        self.p1.scale(factor, pivot); self.p2.scale(factor, pivot)
+    def spans(self, world_to_screen: Callable[[float, float], Tuple[int, int]]) -> Spans:
+        """Pixels de tela da reta como spans (y, x_inicio, x_fim), sem recorte."""
+        a, b = self.pontos_mundo()
+        x0, y0 = world_to_screen(*a)
+        x1, y1 = world_to_screen(*b)
+        return self._spans_algoritmo(self.algoritmo)(x0, y0, x1, y1)
+
+    def contem_pixel(self, world_to_screen: Callable[[float, float], Tuple[int, int]], sx: int, sy: int,
+                     folga: int = 0) -> bool:
+        return contem_pixel(self.spans(world_to_screen), sx, sy, folga)
 
     def draw(self, surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
              color: Color = (0, 0, 0)) -> None:
-        x0, y0 = world_to_screen(self.p1.x, self.p1.y)
-        x1, y1 = world_to_screen(self.p2.x, self.p2.y)
-        if self.algoritmo.upper() == "DDA":
-            self._raster_dda(surface, x0, y0, x1, y1, color)
-        else:
-            self._raster_bresenham(surface, x0, y0, x1, y1, color)
+        desenhar_spans(surface, self.spans(world_to_screen), color)
 
     @staticmethod
-    def _raster_dda(surface: pg.Surface, x0: int, y0: int, x1: int, y1: int, color: Color) -> None:
-        x0_f, y0_f = float(x0), float(y0)
-        x1_f, y1_f = float(x1), float(y1)
-        dx, dy = x1_f - x0_f, y1_f - y0_f
-        steps = int(max(abs(dx), abs(dy)))
-        if steps == 0:
-            if 0 <= x0 < surface.get_width() and 0 <= y0 < surface.get_height():
-                surface.set_at((x0, y0), color)
-            return
-        inc_x, inc_y = dx / steps, dy / steps
-        x, y = x0_f, y0_f
-        for _ in range(steps + 1):
-            xi, yi = int(round(x)), int(round(y))
-            if 0 <= xi < surface.get_width() and 0 <= yi < surface.get_height():
-                surface.set_at((xi, yi), color)
-            x += inc_x; y += inc_y
-
-    @staticmethod
-    def _raster_bresenham(surface: pg.Surface, x0: int, y0: int, x1: int, y1: int, color: Color) -> None:
-        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
-        steep = abs(y1 - y0) > abs(x1 - x0)
-        if steep: x0, y0, x1, y1 = y0, x0, y1, x1
-        if x0 > x1: x0, x1, y0, y1 = x1, x0, y1, y0
-        dx = x1 - x0; dy = abs(y1 - y0)
-        err = dx // 2; y_step = 1 if y0 < y1 else -1; y = y0
-        for x in range(x0, x1 + 1):
-            if steep:
-                if 0 <= y < surface.get_width() and 0 <= x < surface.get_height():
-                    surface.set_at((y, x), color)
-            else:
-                if 0 <= x < surface.get_width() and 0 <= y < surface.get_height():
-                    surface.set_at((x, y), color)
-            err -= dy
-            if err < 0:
-                y += y_step; err += dx
+    def _spans_algoritmo(algoritmo: str) -> Callable[[int, int, int, int], Spans]:
+        return spans_dda if algoritmo.upper() == "DDA" else spans_bresenham
 
 
 # -------------------------
 # Circunferencia (centro + ponto de borda)
 # -------------------------
 @dataclass
-class Circunferencia:
+class Circunferencia(_Composto):
     """Circunferencia definida por centro e um ponto da borda."""
     centro: Ponto
     borda: Ponto  # ponto que define o raio (distância ao centro)
+    matriz: Matriz = IDENTIDADE
+    compartilhado: bool = field(default=False, init=False, repr=False, compare=False)
+    _revisao: int = field(default=0, init=False, repr=False, compare=False)
+    _molde: tuple | None = field(default=None, init=False, repr=False, compare=False)
+
+    def pontos(self) -> List[Ponto]:
+        return [self.centro, self.borda]
+
+    def _copia_crua(self) -> Circunferencia:
+        return Circunferencia(Ponto(self.centro.x, self.centro.y), Ponto(self.borda.x, self.borda.y))
 
     @property
     def raio(self) -> float:
         """Raio em unidades de mundo (distancia centro-borda)."""
-        return math.hypot(self.borda.x - self.centro.x, self.borda.y - self.centro.y)
+        (cx, cy), (bx, by) = self.pontos_mundo()
+        return math.hypot(bx - cx, by - cy)
 
-    def translate(self, dx: float, dy: float) -> None:
-        self.centro.translate(dx, dy); self.borda.translate(dx, dy)
-
-    def scale(self, factor: float, pivot: Vec2) -> None:
-        self.centro.scale(factor, pivot); self.borda.scale(factor, pivot)
+    def spans(self, world_to_screen: Callable[[float, float], Tuple[int, int]]) -> Spans:
+        """Pixels de tela da circunferência (ponto médio) como spans, sem recorte."""
+        # Converte centro e borda para tela e calcula raio em pixels
+        c, b = self.pontos_mundo()
+        cx, cy = world_to_screen(*c)
+        bx, by = world_to_screen(*b)
+        r = int(round(math.hypot(bx - cx, by - cy)))
+        return spans_circunferencia(cx, cy, r)
 
-    def rotate(self, angle_deg: float, pivot: Vec2) -> None:
-        self.centro.rotate(angle_deg, pivot); self.borda.rotate(angle_deg, pivot)
+    def contem_pixel(self, world_to_screen: Callable[[float, float], Tuple[int, int]], sx: int, sy: int,
+                     folga: int = 0) -> bool:
+        return contem_pixel(self.spans(world_to_screen), sx, sy, folga)
 
     def draw(self, surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
              color: Color = (0, 0, 0)) -> None:
-        # Converte centro e borda para tela e calcula raio em pixels
-        cx, cy = world_to_screen(self.centro.x, self.centro.y)
-        bx, by = world_to_screen(self.borda.x, self.borda.y)
-        r = int(round(math.hypot(bx - cx, by - cy)))
-        if r <= 0:
-            return
-
-        # Bresenham/Midpoint Circle em tela
-        x, y = 0, r
-        p = 1 - r
-
-        def plot8(xc, yc, x_, y_):
-            pts = [(xc + x_, yc + y_), (xc - x_, yc + y_), (xc + x_, yc - y_), (xc - x_, yc - y_),
-                   (xc + y_, yc + x_), (xc - y_, yc + x_), (xc + y_, yc - x_), (xc - y_, yc - x_)]
-            w, h = surface.get_width(), surface.get_height()
-            for px, py in pts:
-                if 0 <= px < w and 0 <= py < h:
-                    surface.set_at((int(px), int(py)), color)
-
-        plot8(cx, cy, x, y)
-        while x < y:
-            x += 1
-            if p < 0:
-                p += 2 * x + 1
-            else:
-                y -= 1
-                p += 2 * (x - y) + 1
-            plot8(cx, cy, x, y)
+        desenhar_spans(surface, self.spans(world_to_screen), color)
 
 
 # -------------------------
 # Poligono
 # -------------------------
+MAX_ESCALAS_CACHE = 8  # quantas escalas diferentes guardamos por polígono
+
+
 @dataclass
-class Poligono:
+class Poligono(_Composto):
     """Polígono simples definido por lista de vértices."""
     vertices: List[Ponto]
     algoritmo: str = "BRESENHAM"
     fechado: bool = False
+    preenchido: bool = False
+    regra: str = "PAR_IMPAR"  # 'PAR_IMPAR' (even-odd) ou 'NAO_NULO' (nonzero)
+    matriz: Matriz = IDENTIDADE
+    compartilhado: bool = field(default=False, init=False, repr=False, compare=False)
+    _revisao: int = field(default=0, init=False, repr=False, compare=False)
+    _molde: tuple | None = field(default=None, init=False, repr=False, compare=False)
+    # escala efetiva -> (chave de revisão, simplificados, matriz, simplificados com a matriz), em ordem de uso
+    _cache_simpl: Dict[float, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def pontos(self) -> List[Ponto]:
+        return self.vertices
+
+    def _copia_crua(self) -> Poligono:
+        novos = {v: Ponto(v.x, v.y) for v in self.vertices}  # vértice repetido continua repetido
+        return Poligono([novos[v] for v in self.vertices], self.algoritmo, self.fechado, self.preenchido,
+                        self.regra)
 
     def add_vertice(self, p: Ponto) -> None:
         if not self.fechado:
+            # `p` está em coordenadas de mundo: a matriz pendente não pode valer para ele
+            self.consolidar()
             self.vertices.append(p)
+            self._adotar(p)
 
     def close(self) -> None:
         self.fechado = True
 
+    def vertices_simplificados(self, escala: float, tolerancia_px: float = 0.5) -> List[Vec2]:
+        """Vértices efetivos (x, y) simplificados para desenho na escala dada (pixels por unidade).
+
+        A simplificação é feita nos vértices guardados, com a tolerância
+        corrigida pelo fator de escala da matriz pendente, e só o resultado é
+        transformado. Fica em cache por escala efetiva e é descartado quando um
+        vértice deste polígono é movido ou adicionado. `self.vertices` não é alterado.
+        """
+        m = self.matriz
+        escala_ef = round(escala * fator_escala(m), 9)
+        chave = self._chave_revisao()
+        cache = self._cache_simpl
+        # pop + reinserção mantém o dict em ordem de uso (o primeiro é o menos recente)
+        entrada = cache.pop(escala_ef, None)
+        if entrada is not None and entrada[0] == chave:
+            if entrada[2] == m:
+                cache[escala_ef] = entrada
+                return entrada[3]
+            pts = entrada[1]
+        else:
+            while len(cache) >= MAX_ESCALAS_CACHE:
+                cache.pop(list(cache)[0], None)
+            pts = simplificar([v.as_tuple() for v in self.vertices], tolerancia_px / escala_ef) if escala_ef > 0 \
+                else [v.as_tuple() for v in self.vertices[:1]]
+        efetivos = pts if m is IDENTIDADE else [aplicar_matriz(m, x, y) for x, y in pts]
+        cache[escala_ef] = (chave, pts, m, efetivos)
+        return efetivos
+
+    def spans(self, world_to_screen: Callable[[float, float], Tuple[int, int]],
+              escala: float | None = None) -> Spans:
+        """Pixels de tela do contorno como spans, unindo os de cada aresta."""
+        return unir_spans(*(Reta._spans_algoritmo(self.algoritmo)(x0, y0, x1, y1)
+                            for (x0, y0), (x1, y1) in self._arestas_tela(world_to_screen, escala)))
+
+    def contem_pixel(self, world_to_screen: Callable[[float, float], Tuple[int, int]], sx: int, sy: int,
+                     escala: float | None = None, folga: int = 0) -> bool:
+        """Acerto no contorno ou, se preenchido, no interior (só as linhas perto de sy são varridas)."""
+        if contem_pixel(self.spans(world_to_screen, escala), sx, sy, folga):
+            return True
+        if self.preenchido and len(self.vertices) >= 3:
+            interior = self.spans_preenchimento(world_to_screen, escala, sy - folga, sy + folga)
+            return contem_pixel(interior, sx, sy, folga)
+        return False
+
+    def spans_preenchimento(self, world_to_screen: Callable[[float, float], Tuple[int, int]],
+                            escala: float | None = None, y_min: int | None = None,
+                            y_max: int | None = None) -> Spans:
+        """Spans do interior (varredura com ET/AET) segundo `self.regra`."""
+        return spans_preenchimento(self._vertices_tela(world_to_screen, escala), self.regra, y_min, y_max)
+
+    def _vertices_tela(self, world_to_screen: Callable[[float, float], Tuple[int, int]],
+                       escala: float | None) -> List[Tuple[int, int]]:
+        if not self.vertices:
+            return []
+        if escala is None:
+            pts = self.pontos_mundo()
+        else:
+            pts = self.vertices_simplificados(escala)
+        # Vértices consecutivos no mesmo pixel não geram segmentos
+        tela = [world_to_screen(x, y) for x, y in pts]
+        return [p for i, p in enumerate(tela) if i == 0 or p != tela[i - 1]]
+
+    def _arestas_tela(self, world_to_screen: Callable[[float, float], Tuple[int, int]],
+                      escala: float | None) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        if len(self.vertices) < 2:
+            return []
+        tela = self._vertices_tela(world_to_screen, escala)
+        if self.fechado and len(tela) > 2:
+            tela.append(tela[0])
+        if len(tela) == 1:
+            tela.append(tela[0])
+        return list(zip(tela, tela[1:]))
+
+    def draw(self, surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
+             color: Color = (0, 0, 0), escala: float | None = None,
+             cor_preenchimento: Color | None = None) -> None:
+        if self.preenchido and len(self.vertices) >= 3:
+            clip = surface.get_clip()
+            desenhar_spans(surface, self.spans_preenchimento(world_to_screen, escala, clip.top, clip.bottom - 1),
+                           cor_preenchimento or color)
+        raster = Reta._spans_algoritmo(self.algoritmo)
+        for (x0, y0), (x1, y1) in self._arestas_tela(world_to_screen, escala):
+            desenhar_spans(surface, raster(x0, y0, x1, y1), color)
+
+
+# -------------------------
+# Instâncias de geometria compartilhada
+# -------------------------
+MAX_RASTERS_MOLDE = 8  # combinações (conversão, escala, cores) guardadas por molde
+MAX_AREA_RASTER = 1200 * 700  # px; formas maiores que a janela não viram sprite
+
+
+def _envoltoria_convexa(pontos: List[Vec2]) -> List[Vec2]:
+    """Envoltória convexa (cadeia monótona de Andrew), sem pontos colineares."""
+    pts = sorted(set(pontos))
+    if len(pts) <= 2:
+        return pts
+
+    def cruz(o: Vec2, a: Vec2, b: Vec2) -> float:
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    inferior: List[Vec2] = []
+    for p in pts:
+        while len(inferior) >= 2 and cruz(inferior[-2], inferior[-1], p) <= 0:
+            inferior.pop()
+        inferior.append(p)
+    superior: List[Vec2] = []
+    for p in reversed(pts):
+        while len(superior) >= 2 and cruz(superior[-2], superior[-1], p) <= 0:
+            superior.pop()
+        superior.append(p)
+    return inferior[:-1] + superior[:-1]
+
+
+def _desenhar_forma(surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
+                    forma: _Composto, color: Color, escala: float | None,
+                    cor_preenchimento: Color | None) -> None:
+    if isinstance(forma, Poligono):
+        forma.draw(surface, world_to_screen, color, escala, cor_preenchimento)
+    else:
+        forma.draw(surface, world_to_screen, color)
+
+
+@dataclass(eq=False)
+class Molde:
+    """Geometria base compartilhada por instâncias.
+
+    `forma` é uma Reta, Circunferencia ou Poligono fora da cena, sem matriz e
+    tratada como imutável. Guarda o raster da forma (para instâncias só
+    transladadas) e os pontos de controle usados na seleção.
+    """
+    forma: _Composto
+    _rasters: Dict[tuple, tuple] = field(default_factory=dict, init=False, repr=False)
+    _controle: List[Vec2] | None = field(default=None, init=False, repr=False)
+
+    def pontos_controle(self) -> List[Vec2]:
+        """Pontos que ficam dentro de um retângulo se e só se todos os pontos da forma ficam.
+
+        Para polígonos é a envoltória convexa dos vértices; para os demais, os próprios pontos.
+        """
+        if self._controle is None:
+            pts = self.forma.pontos_mundo()
+            self._controle = _envoltoria_convexa(pts) if isinstance(self.forma, Poligono) else pts
+        return self._controle
+
+    def centroide(self) -> Tuple[Vec2, int]:
+        """Média dos pontos da forma e quantos são (para compor o pivô da seleção)."""
+        pts = self.forma.pontos_mundo()
+        n = len(pts)
+        return (sum(x for x, _ in pts) / n, sum(y for _, y in pts) / n), n
+
+    def raster(self, world_to_screen: Callable[[float, float], Tuple[int, int]], color: Color,
+               escala: float | None = None,
+               cor_preenchimento: Color | None = None) -> Tuple[pg.Surface | None, Tuple[int, int] | None]:
+        """Sprite da forma desenhada na própria posição e o canto superior esquerdo dele na tela.
+
+        Forma sem pixels dá (None, (0, 0)); forma cujo retângulo passa de
+        MAX_AREA_RASTER dá (None, None) e deve ser desenhada direto.
+        """
+        chave = (world_to_screen, color, escala, cor_preenchimento)
+        entrada = self._rasters.get(chave)
+        if entrada is not None:
+            return entrada
+        forma = self.forma
+        spans = forma.spans(world_to_screen, escala) if isinstance(forma, Poligono) else forma.spans(world_to_screen)
+        if not spans:
+            entrada = (None, (0, 0))
+        else:
+            x0 = min(a for _, a, _ in spans); x1 = max(b for _, _, b in spans)
+            y0 = spans[0][0]; y1 = spans[-1][0]
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_AREA_RASTER:
+                entrada = (None, None)
+            else:
+                sprite = pg.Surface((x1 - x0 + 1, y1 - y0 + 1), pg.SRCALPHA)
+
+                def local(x: float, y: float) -> Tuple[int, int]:
+                    sx, sy = world_to_screen(x, y)
+                    return sx - x0, sy - y0
+
+                _desenhar_forma(sprite, local, forma, color, escala, cor_preenchimento)
+                entrada = (sprite, (x0, y0))
+        if len(self._rasters) >= MAX_RASTERS_MOLDE:
+            self._rasters.clear()
+        self._rasters[chave] = entrada
+        return entrada
+
+
+@dataclass(eq=False, slots=True)
+class Instancia:
+    """Cópia de um Molde com matriz afim própria; não tem pontos próprios.
+
+    Memória e rasterização crescem com o nº de moldes, não de cópias: só a
+    matriz é guardada por instância, e uma instância apenas transladada é
+    desenhada copiando o raster do molde.
+    """
+    molde: Molde
+    matriz: Matriz = IDENTIDADE
+
+    # Lida por Transformacao.aplicar: a instância sempre acumula a matriz
+    compartilhado: ClassVar[bool] = False
+
+    def pontos(self) -> List[Ponto]:
+        return []
+
+    def transformar(self, m: Matriz) -> None:
+        self.matriz = compor(m, self.matriz)
+
     def translate(self, dx: float, dy: float) -> None:
-        for v in self.vertices: v.translate(dx, dy)
+        self.transformar(matriz_translacao(dx, dy))
 
     def rotate(self, angle_deg: float, pivot: Vec2) -> None:
-        for v in self.vertices: v.rotate(angle_deg, pivot)
+        self.transformar(matriz_rotacao(angle_deg, pivot))
 
     def scale(self, factor: float, pivot: Vec2) -> None:
-        for v in self.vertices: v.scale(factor, pivot)
+        self.transformar(matriz_escala(factor, pivot))
+
+    def forma(self) -> _Composto:
+        """Forma do molde com a matriz da instância, sem copiar os pontos."""
+        forma = copy.copy(self.molde.forma)  # cópia rasa: compartilha pontos e cache de simplificação
+        forma.matriz = self.matriz
+        return forma
+
+    def pontos_mundo(self) -> List[Vec2]:
+        return self.forma().pontos_mundo()
+
+    def pontos_controle(self) -> List[Vec2]:
+        """Pontos de controle do molde já transformados (ver Molde.pontos_controle)."""
+        m = self.matriz
+        return [aplicar_matriz(m, x, y) for x, y in self.molde.pontos_controle()]
+
+    def dentro(self, xmin: float, xmax: float, ymin: float, ymax: float) -> bool:
+        """True se a forma inteira está no retângulo do mundo (mesma regra dos objetos completos)."""
+        return all(xmin <= x <= xmax and ymin <= y <= ymax for x, y in self.pontos_controle())
+
+    def centroide(self) -> Tuple[Vec2, int]:
+        (x, y), n = self.molde.centroide()
+        return aplicar_matriz(self.matriz, x, y), n
+
+    def contem_pixel(self, world_to_screen: Callable[[float, float], Tuple[int, int]], sx: int, sy: int,
+                     escala: float | None = None, folga: int = 0) -> bool:
+        forma = self.forma()
+        if isinstance(forma, Poligono):
+            return forma.contem_pixel(world_to_screen, sx, sy, escala, folga)
+        return forma.contem_pixel(world_to_screen, sx, sy, folga)
 
     def draw(self, surface: pg.Surface, world_to_screen: Callable[[float, float], Tuple[int, int]],
-             color: Color = (0, 0, 0)) -> None:
-        if len(self.vertices) < 2:
-            return
-        for i in range(len(self.vertices) - 1):
-            Reta(self.vertices[i], self.vertices[i + 1], self.algoritmo).draw(surface, world_to_screen, color)
-        # Se quiser fechar o poligono:
-        # if self.fechado:
-        #     Reta(self.vertices[-1], self.vertices[0], self.algoritmo).draw(surface, world_to_screen, color)
+             color: Color = (0, 0, 0), escala: float | None = None,
+             cor_preenchimento: Color | None = None) -> None:
+        m = self.matriz
+        if m[:4] == (1.0, 0.0, 0.0, 1.0):
+            sprite, origem = self.molde.raster(world_to_screen, color, escala, cor_preenchimento)
+            if sprite is not None:
+                x0, y0 = origem
+                # Deslocamento em pixels medido no primeiro ponto da forma
+                ref = self.molde.forma.pontos()[0]
+                rx, ry = ref.x, ref.y
+                ax, ay = world_to_screen(rx, ry)
+                bx, by = world_to_screen(rx + m[4], ry + m[5])
+                surface.blit(sprite, (x0 + bx - ax, y0 + by - ay))
+            if origem is not None:
+                return
+        _desenhar_forma(surface, world_to_screen, self.forma(), color, escala, cor_preenchimento)
@@ -0,0 +1,185 @@
+"""
+Gravação e reprodução acelerada de sessões de edição.
+
+Gravar (janela normal; o arquivo recebe um evento por linha em JSON):
+    python gravacao.py gravar sessao.jsonl
+Reproduzir sem janela, sem o limite de 60 FPS, e medir o custo da sessão:
+    python gravacao.py reproduzir sessao.jsonl [--sem-memoria]
+
+A reprodução entrega os eventos em lotes iguais aos quadros gravados, pelo
+mesmo loop de main(), e informa quadros por segundo, latência por evento
+(da entrega até o próximo quadro pronto), pico de memória e o tempo de desenho
+da cena. O pico do tracemalloc cobre só o heap do Python; as superfícies do SDL
+e os arrays do numpy aparecem no pico do processo (ru_maxrss, onde houver). Cada alteração da cena espera a thread de desenho
+concluir o quadro, então a latência inclui o desenho.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import pygame as pg
+
+
+def _serializar(ev):
+    """
+    Converte um evento pygame em dicionário JSON, ignorando atributos não serializáveis.
+    """
+    dados = {}
+    for k, v in ev.dict.items():
+        if isinstance(v, tuple):
+            v = list(v)
+        if v is None or isinstance(v, (bool, int, float, str, list)):
+            dados[k] = v
+    return dados
+
+
+def _desserializar(reg):
+    dados = {k: tuple(v) if isinstance(v, list) else v for k, v in reg["dados"].items()}
+    return pg.event.Event(reg["tipo"], dados)
+
+
+class GravadorEventos:
+    """
+    Fonte de eventos para main() que repassa pg.event.get e grava cada evento
+    com o número do quadro e o instante (segundos desde o início da gravação).
+    """
+    def __init__(self, caminho, fonte=None):
+        self.arquivo = open(caminho, "w", encoding="utf-8")
+        self.fonte = fonte or pg.event.get
+        self.quadro = 0
+        self.t0 = time.perf_counter()
+
+    def __call__(self):
+        evs = self.fonte()
+        t = time.perf_counter() - self.t0
+        for ev in evs:
+            reg = {"q": self.quadro, "t": round(t, 6), "tipo": ev.type,
+                   "nome": pg.event.event_name(ev.type), "dados": _serializar(ev)}
+            self.arquivo.write(json.dumps(reg) + "\n")
+        self.quadro += 1
+        return evs
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class ReprodutorEventos:
+    """
+    Fonte de eventos para main() que entrega uma sessão gravada o mais rápido
+    possível: um lote por quadro gravado (quadros sem eventos são pulados) e,
+    ao final, um QUIT. Mede a latência de cada evento entregue.
+    """
+    def __init__(self, caminho):
+        lotes = {}
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    reg = json.loads(linha)
+                    lotes.setdefault(reg["q"], []).append(reg)
+        self.lotes = [lotes[q] for q in sorted(lotes)]
+        self.proximo = 0
+        self.quadros = 0
+        self.n_eventos = 0
+        self.latencias = []
+        self._entregues = 0
+        self._t_entrega = None
+
+    def __call__(self):
+        agora = time.perf_counter()
+        if self._entregues:
+            # Eventos do lote anterior já foram tratados e o quadro seguinte desenhado
+            self.latencias.extend([agora - self._t_entrega] * self._entregues)
+        self.quadros += 1
+        pg.event.get()  # descarta eventos reais da janela headless
+        if self.proximo >= len(self.lotes):
+            self._entregues = 0
+            return [pg.event.Event(pg.QUIT)]
+        lote = [_desserializar(reg) for reg in self.lotes[self.proximo]
+                if reg["tipo"] != pg.QUIT]
+        self.proximo += 1
+        self.n_eventos += len(lote)
+        self._entregues = len(lote)
+        self._t_entrega = time.perf_counter()
+        return lote
+
+
+def _percentil(valores, p):
+    if not valores: return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def gravar(caminho):
+    """
+    Abre o editor normalmente gravando a sessão em `caminho`.
+    """
+    import main as app
+    gravador = GravadorEventos(caminho)
+    try:
+        app.main(fonte_eventos=gravador)
+    finally:
+        gravador.fechar()
+
+
+def _pico_processo_mb():
+    """
+    Pico de memória residente do processo inteiro desde o início, em MB
+    (None sem o módulo resource). O ru_maxrss vem em KB no Linux e em bytes no macOS.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def reproduzir(caminho, medir_memoria=True):
+    """
+    Reproduz a sessão gravada sem janela e sem limite de FPS.
+    Retorna um dicionário com as métricas da execução.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import main as app
+    reprodutor = ReprodutorEventos(caminho)
+    if medir_memoria:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    desenho = app.main(fonte_eventos=reprodutor, limitar_fps=False, esperar_desenho=True)
+    duracao = time.perf_counter() - t0
+    pico = 0
+    if medir_memoria:
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    lat = reprodutor.latencias
+    return {
+        "quadros": reprodutor.quadros,
+        "eventos": reprodutor.n_eventos,
+        "duracao_s": duracao,
+        "fps": reprodutor.quadros / duracao if duracao > 0 else 0.0,
+        "latencia_media_ms": 1000 * sum(lat) / len(lat) if lat else 0.0,
+        "latencia_p50_ms": 1000 * _percentil(lat, 50),
+        "latencia_p95_ms": 1000 * _percentil(lat, 95),
+        "latencia_max_ms": 1000 * max(lat) if lat else 0.0,
+        "pico_heap_python_mb": pico / (1024 * 1024),
+        "pico_processo_mb": _pico_processo_mb(),
+        "quadros_desenhados": desenho["quadros"],
+        "desenho_medio_ms": 1000 * desenho["desenho_medio_s"],
+        "desenho_max_ms": 1000 * desenho["desenho_max_s"],
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("gravar", "reproduzir"):
+        print(__doc__)
+        sys.exit(2)
+    if sys.argv[1] == "gravar":
+        gravar(sys.argv[2])
+    else:
+        metricas = reproduzir(sys.argv[2], medir_memoria="--sem-memoria" not in sys.argv[3:])
+        for k, v in metricas.items():
+            print(f"{k:>20}: {v:.3f}" if isinstance(v, float) else f"{k:>20}: {v}")
@@ -1,8 +1,18 @@
 import sys
 import logging
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
 import pygame as pg
-from entities import Ponto, Reta, Circunferencia, Poligono
+from nuvem import MapaDensidade
+from renderizador import RenderizadorAssincrono
+from selecao import SelecaoIncremental
+from entities import Ponto, Reta, Circunferencia, Poligono, Instancia
+from rasterizacao import (marcar_segmentos, marcar_circunferencias, dilatar, desenhar_spans, spans_dda,
+                          spans_bresenham)
 from transformacoes import Translacao, Rotacao, Escala
+from afim import compor
+from simplificacao import simplificar
 
 # -------------------------
 # Logging
@@ -57,6 +67,7 @@ COR_RETA = (0,0,0)
 COR_PREVIA = (120,120,120)
 COR_CIRC = (0,0,0)
 COR_POLI = (0,0,0)
+COR_POLI_PREENCH = (170,200,240)
 
 # Seleção
 COR_SEL_BORDA = (30,144,255)
@@ -71,6 +82,10 @@ COR_INPUT_BORDA = (100,100,100)
 COR_BTN_OK = (180,240,200)
 COR_BTN_CANCEL = (240,200,200)
 COR_DIM = (0,0,0,90)
+COR_FANTASMA = (255,140,0,220)
+# Prévia: polígonos com mais vértices que isto são simplificados por faixa de escala (potência de 2)
+VERTICES_SIMPL_PREVIA = 32
+FAIXAS_ESCALA_PREVIA = (-10, 10)
 
 TAM_FONTE = 16
 
@@ -78,12 +93,24 @@ ABA_RETAS  = "RETAS"
 ABA_CIRC   = "CIRCUNF"
 ABA_POLI   = "POLIGONOS"
 ABA_TRANSF = "TRANSFORM"
+ABA_NUVEM  = "NUVEM"
 
 ALGO_DDA  = "DDA"
 ALGO_BRES = "BRESENHAM"
 
+REGRA_PAR_IMPAR = "PAR_IMPAR"
+REGRA_NAO_NULO  = "NAO_NULO"
+
 ESP_GUIA = 1
 
+# Dirty rects: acima desta fração da janela danificada fazemos flip completo
+LIMIAR_DANO_TOTAL = 0.5
+MAX_RECTS_DANO = 4
+
+# Seleção ao vivo
+TAM_CELULA_SELECAO = 24  # px, lado das células do índice espacial
+FOLGA_CLIQUE = 2         # px de tolerância ao escolher um objeto com um clique
+
 # -------------------------
 # Inicialização / conversões
 # -------------------------
@@ -117,6 +144,95 @@ def tela_para_mundo(sx, sy):
     cx, cy = LARGURA_CANVAS//2, ALTURA//2
     return (sx - cx) / ESCALA, (cy - sy) / ESCALA
 
+# -------------------------
+# Regiões danificadas
+# -------------------------
+class Danos:
+    """
+    Acumula as regiões da janela que mudaram desde o último quadro.
+    O quadro seguinte redesenha só essas regiões e as apresenta com
+    pg.display.update(rects); se o dano for grande demais, faz flip completo.
+    """
+    def __init__(self):
+        self.janela = pg.Rect(0, 0, LARGURA_TOTAL, ALTURA)
+        self.rects = []
+        self.total = True  # primeiro quadro desenha tudo
+
+    def marcar(self, rect):
+        if self.total or rect is None: return
+        r = pg.Rect(rect); r.normalize()
+        r = r.clip(self.janela)
+        if r.w > 0 and r.h > 0:
+            self.rects.append(r)
+
+    def marcar_tudo(self):
+        self.total = True; self.rects = []
+
+    def marcar_canvas(self):
+        self.marcar(pg.Rect(0, 0, LARGURA_CANVAS, ALTURA))
+
+    def marcar_painel(self):
+        self.marcar(pg.Rect(LARGURA_CANVAS, 0, LARGURA_PAINEL, ALTURA))
+
+    def coletar(self):
+        """
+        Retorna (total, rects) para o quadro atual e zera o acumulador.
+        Retângulos sobrepostos são unidos; muitos retângulos viram um só.
+        """
+        total, rects = self.total, self.rects
+        self.total = False; self.rects = []
+        if total or not rects:
+            return total, []
+        unidos = []
+        for r in rects:
+            r = r.copy()
+            i = r.collidelist(unidos)
+            while i != -1:
+                r.union_ip(unidos.pop(i))
+                i = r.collidelist(unidos)
+            unidos.append(r)
+        if len(unidos) > MAX_RECTS_DANO:
+            unidos = [unidos[0].unionall(unidos[1:])]
+        area = sum(r.w * r.h for r in unidos)
+        if area > LIMIAR_DANO_TOTAL * self.janela.w * self.janela.h:
+            return True, []
+        return False, unidos
+
+
+def rect_segmento(a, b, folga=2):
+    """
+    Retângulo de tela que cobre o segmento entre dois pontos de tela.
+    """
+    r = pg.Rect(min(a[0], b[0]), min(a[1], b[1]), abs(b[0]-a[0]) + 1, abs(b[1]-a[1]) + 1)
+    return r.inflate(2*folga, 2*folga)
+
+def rect_ponto(fonte, p):
+    """
+    Retângulo de tela ocupado pelo marcador (inclusive destaque de seleção) e rótulo de um ponto.
+    """
+    x, y = p.mundo()
+    sx, sy = mundo_para_tela(x, y)
+    raio = RAIO_PONTO + 3
+    w, h = fonte.size(f"({x:.2f}, {y:.2f})")
+    r = pg.Rect(sx - raio, sy - raio, 2*raio + 1, 2*raio + 1)
+    return r.union(pg.Rect(sx + DESLOC_TEXTO[0], sy + DESLOC_TEXTO[1], w, h))
+
+def rect_entidade(ent):
+    """
+    Retângulo de tela que cobre o desenho de uma reta, circunferência ou polígono.
+    """
+    if isinstance(ent, Instancia):
+        ent = ent.forma()
+    pts = ent.pontos_mundo()
+    if isinstance(ent, Reta):
+        return rect_segmento(mundo_para_tela(*pts[0]), mundo_para_tela(*pts[1]))
+    if isinstance(ent, Circunferencia):
+        cx, cy = mundo_para_tela(*pts[0])
+        r = int(ent.raio * ESCALA) + 2
+        return pg.Rect(cx - r, cy - r, 2*r + 1, 2*r + 1)
+    xs = [x for x, _ in pts]; ys = [y for _, y in pts]
+    return rect_segmento(mundo_para_tela(min(xs), max(ys)), mundo_para_tela(max(xs), min(ys)))
+
 # -------------------------
 # Canvas
 # -------------------------
@@ -150,7 +266,7 @@ def desenhar_canvas(tela):
 # -------------------------
 # Painel lateral
 # -------------------------
-def desenhar_painel(tela, fonte, aba, algo):
+def desenhar_painel(tela, fonte, aba, algo, preencher=False, regra=REGRA_PAR_IMPAR, mapa=None):
     """
     Desenha o painel lateral com abas, botões e controles de acordo com a aba ativa.
     Retorna os retângulos das abas e controles para detecção de clique.
@@ -159,7 +275,7 @@ def desenhar_painel(tela, fonte, aba, algo):
     pg.draw.rect(tela, COR_PAINEL_BG, painel_rect)
     pg.draw.line(tela, COR_PAINEL_BORDA, (LARGURA_CANVAS,0),(LARGURA_CANVAS,ALTURA),1)
 
-    tabs = [(ABA_RETAS,"Retas"),(ABA_CIRC,"Circunf."),(ABA_POLI,"Polígonos"),(ABA_TRANSF,"Transform.")]
+    tabs = [(ABA_RETAS,"Retas"),(ABA_CIRC,"Circunf."),(ABA_POLI,"Polígonos"),(ABA_TRANSF,"Transform."),(ABA_NUVEM,"Nuvem")]
     tab_rects={}
     pad=10; tab_w=LARGURA_PAINEL-pad*2; tab_h=34; y=pad
     for key,label in tabs:
@@ -167,14 +283,14 @@ def desenhar_painel(tela, fonte, aba, algo):
         cor=COR_TAB_ATIVA if key==aba else COR_TAB_INATIVA
         pg.draw.rect(tela, cor, r, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r, 1, border_radius=8)
-        surf=pg.font.Font(None, TAM_FONTE).render(label,True,(0,0,0))
+        surf=fonte.render(label,True,(0,0,0))
         tela.blit(surf, surf.get_rect(center=r.center))
         tab_rects[key]=r; y+=tab_h+6
 
     ctrl_rects={}
     content_x=LARGURA_CANVAS+pad
     content_y=y+6
-    tela.blit(pg.font.Font(None, TAM_FONTE).render(f"Opções — {aba.title()}",True,(0,0,0)), (content_x,content_y))
+    tela.blit(fonte.render(f"Opções — {aba.title()}",True,(0,0,0)), (content_x,content_y))
     cy=content_y+28
     btn_w=150; btn_h=36
 
@@ -185,44 +301,72 @@ def desenhar_painel(tela, fonte, aba, algo):
         pg.draw.rect(tela, COR_BOTAO_ATIVO if algo==ALGO_BRES else COR_BOTAO, r_bres, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_dda,1,border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_bres,1,border_radius=8)
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("DDA",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("DDA",True,(0,0,0)).get_rect(center=r_dda.center))
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("Bresenham",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("Bresenham",True,(0,0,0)).get_rect(center=r_bres.center))
+        _texto_centralizado(tela, fonte, "DDA", r_dda)
+        _texto_centralizado(tela, fonte, "Bresenham", r_bres)
         cy+=btn_h+12
         r_limpar=pg.Rect(content_x,cy,btn_w,btn_h)
         pg.draw.rect(tela, COR_BOTAO, r_limpar, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_limpar,1,border_radius=8)
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)).get_rect(center=r_limpar.center))
+        _texto_centralizado(tela, fonte, "Limpar", r_limpar)
         ctrl_rects={"DDA":r_dda,"BRES":r_bres,"LIMPAR":r_limpar}
 
     elif aba==ABA_CIRC:
         r_limpar=pg.Rect(content_x,cy,btn_w,btn_h)
         pg.draw.rect(tela, COR_BOTAO, r_limpar, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_limpar,1,border_radius=8)
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)).get_rect(center=r_limpar.center))
+        _texto_centralizado(tela, fonte, "Limpar", r_limpar)
         ctrl_rects={"LIMPAR":r_limpar}
 
     elif aba==ABA_POLI:
+        r_preench=pg.Rect(content_x,cy,btn_w,btn_h)
+        r_regra=pg.Rect(content_x+btn_w+12,cy,btn_w,btn_h)
+        pg.draw.rect(tela, COR_BOTAO_ATIVO if preencher else COR_BOTAO, r_preench, border_radius=8)
+        pg.draw.rect(tela, COR_BOTAO, r_regra, border_radius=8)
+        pg.draw.rect(tela, COR_BORDA, r_preench,1,border_radius=8)
+        pg.draw.rect(tela, COR_BORDA, r_regra,1,border_radius=8)
+        txt_regra = "Regra: par-ímpar" if regra==REGRA_PAR_IMPAR else "Regra: não-nulo"
+        _texto_centralizado(tela, fonte, "Preencher", r_preench)
+        _texto_centralizado(tela, fonte, txt_regra, r_regra)
+        cy+=btn_h+12
         r_limpar=pg.Rect(content_x,cy,btn_w,btn_h)
         pg.draw.rect(tela, COR_BOTAO, r_limpar, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_limpar,1,border_radius=8)
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)).get_rect(center=r_limpar.center))
-        ctrl_rects={"LIMPAR":r_limpar}
+        _texto_centralizado(tela, fonte, "Limpar", r_limpar)
+        ctrl_rects={"PREENCH":r_preench,"REGRA":r_regra,"LIMPAR":r_limpar}
 
     elif aba==ABA_TRANSF:
         r_limpar=pg.Rect(content_x,cy,btn_w,btn_h)
         pg.draw.rect(tela, COR_BOTAO, r_limpar, border_radius=8)
         pg.draw.rect(tela, COR_BORDA, r_limpar,1,border_radius=8)
-        tela.blit(pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)), pg.font.Font(None, TAM_FONTE).render("Limpar",True,(0,0,0)).get_rect(center=r_limpar.center))
+        _texto_centralizado(tela, fonte, "Limpar", r_limpar)
         ctrl_rects={"LIMPAR":r_limpar}
-        _texto_multilinha(tela, pg.font.Font(None, TAM_FONTE), [
+        _texto_multilinha(tela, fonte, [
             "TRANSFORMAÇÕES:",
             "- Arraste com botão esquerdo p/ selecionar",
             "- Só objetos totalmente incluídos serão transformados",
             "- Preencha floats (ponto ou vírgula) e clique OK"
         ], content_x, cy+btn_h+16)
 
+    elif aba==ABA_NUVEM:
+        if mapa is None:
+            linhas = ["Nenhuma nuvem carregada.", "Abra com:", "  python main.py --nuvem arquivo.bin [--f32]",
+                      "(pares x, y em float64, ou float32)"]
+        else:
+            pct = 100.0 * mapa.processados / mapa.total if mapa.total else 100.0
+            linhas = [f"Arquivo: {mapa.caminho[-36:]}",
+                      f"Pontos: {mapa.processados:,} / {mapa.total:,} ({pct:.0f}%)",
+                      "Cor: densidade (escala log) por pixel"]
+        _texto_multilinha(tela, fonte, linhas, content_x, cy)
+
     return tab_rects, ctrl_rects
 
+def _texto_centralizado(tela, fonte, texto, rect):
+    """
+    Escreve `texto` centralizado em `rect`.
+    """
+    surf = fonte.render(texto, True, (0,0,0))
+    tela.blit(surf, surf.get_rect(center=rect.center))
+
 def _texto_multilinha(tela, fonte, linhas, x, y, dy=20):
     """
     Renderiza múltiplas linhas de texto na tela, útil para instruções.
@@ -251,6 +395,10 @@ class InputBox:
         tela.blit(surf, (self.rect.x+6, self.rect.y+8))
 
     def handle_event(self, ev):
+        """
+        Processa o evento; retorna True se o texto ou o foco mudaram.
+        """
+        antes = (self.text, self.active)
         if ev.type == pg.MOUSEBUTTONDOWN and ev.button == 1:
             self.active = self.rect.collidepoint(ev.pos)
         elif ev.type == pg.KEYDOWN and self.active:
@@ -270,6 +418,7 @@ class InputBox:
                         self.text += ch
             if self.text == "-":
                 pass
+        return (self.text, self.active) != antes
 
     def value(self, default=0.0):
         try:
@@ -287,20 +436,50 @@ class InputBox:
 # -------------------------
 # Desenho entidades
 # -------------------------
-def desenhar_pontos(tela, fonte, pontos):
+@lru_cache(maxsize=None)
+def sprite_marcador(raio, cor):
+    """
+    Marcador circular pré-renderizado (mesmos pixels de pg.draw.circle), em cache por raio e cor.
+    """
+    s = pg.Surface((2*raio + 1, 2*raio + 1), pg.SRCALPHA)
+    pg.draw.circle(s, cor, (raio, raio), raio)
+    return s
+
+def coords_para_tela(coords):
+    """
+    Converte várias coordenadas do mundo para a tela de uma vez (mesma conta de mundo_para_tela).
     """
-    Desenha todos os pontos na tela, com rótulo.
+    cx, cy = LARGURA_CANVAS//2, ALTURA//2
+    return [(int(cx + x * ESCALA), int(cy - y * ESCALA)) for x, y in coords]
+
+def pontos_para_tela(pontos):
+    """
+    Posições de tela dos pontos (posição efetiva, ver Ponto.mundo).
+    """
+    return coords_para_tela(map(Ponto.mundo, pontos))
+
+def carimbar_marcadores(tela, coords, raio, cor):
+    """
+    Carimba o sprite do marcador em todas as coordenadas de tela com um único Surface.blits.
+    """
+    sprite = sprite_marcador(raio, cor)
+    tela.blits([(sprite, (sx - raio, sy - raio)) for sx, sy in coords], doreturn=False)
+
+def desenhar_pontos(tela, pontos):
+    """
+    Desenha os pontos de um instantâneo, com rótulo.
+    Cada entrada é ((x, y), texto, rótulo já renderizado), como em InstantaneoCena.
     """
-    for p in pontos:
-        p.draw(tela, mundo_para_tela, radius=RAIO_PONTO, color=COR_PONTO, font=fonte, label_color=COR_TEXTO)
+    coords = coords_para_tela([xy for xy, _, _ in pontos])
+    carimbar_marcadores(tela, coords, RAIO_PONTO, COR_PONTO)
+    dx, dy = DESLOC_TEXTO
+    tela.blits([(rot, (sx + dx, sy + dy)) for (_, _, rot), (sx, sy) in zip(pontos, coords)], doreturn=False)
 
 def desenhar_pontos_selecionados(tela, selecionados):
     """
     Destaca pontos selecionados com cor diferente.
     """
-    for p in selecionados:
-        sx, sy = mundo_para_tela(p.x, p.y)
-        pg.draw.circle(tela, COR_PONTO_SEL, (sx, sy), RAIO_PONTO + 2)
+    carimbar_marcadores(tela, pontos_para_tela(selecionados), RAIO_PONTO + 2, COR_PONTO_SEL)
 
 def desenhar_retas(tela, retas):
     """
@@ -321,28 +500,141 @@ def desenhar_poligonos(tela, poligonos):
     Desenha todos os polígonos na tela.
     """
     for poly in poligonos:
-        poly.draw(tela, mundo_para_tela, color=COR_POLI)
+        poly.draw(tela, mundo_para_tela, color=COR_POLI, escala=ESCALA, cor_preenchimento=COR_POLI_PREENCH)
+
+def desenhar_instancias(tela, instancias):
+    """
+    Desenha as instâncias com as cores do tipo da forma base.
+    """
+    for inst in instancias:
+        forma = inst.molde.forma
+        if isinstance(forma, Poligono):
+            inst.draw(tela, mundo_para_tela, COR_POLI, ESCALA, COR_POLI_PREENCH)
+        else:
+            inst.draw(tela, mundo_para_tela, COR_CIRC if isinstance(forma, Circunferencia) else COR_RETA)
+
+# -------------------------
+# Instantâneo da cena (thread de desenho)
+# -------------------------
+Cena = namedtuple("Cena", "pontos retas circs poligonos instancias")
+
+class InstantaneoCena:
+    """
+    Cópia da cena para a thread de desenho, mantida entre quadros.
+    Cada entidade tem uma entrada própria, refeita só quando ela muda: pontos
+    guardam a posição e o rótulo já renderizado (aqui, na thread principal,
+    pois a fonte não é thread-safe); objetos guardam uma Instancia do seu
+    molde com a matriz atual, então a geometria base e os caches dela
+    (simplificação, raster) valem de um quadro para o outro.
+    congelar() só junta as entradas em tuplas.
+    """
+    def __init__(self, fonte):
+        self.fonte = fonte
+        self.limpar()
+
+    def limpar(self):
+        self.pontos = {}   # Ponto -> ((x, y), texto, rótulo)
+        self.objetos = {Poligono: {}, Instancia: {}, Reta: {}, Circunferencia: {}}  # tipo -> id -> Instancia
+        self.compostos = {}  # id -> objeto (retas, circunferências e polígonos vivos)
+
+    def ponto(self, p):
+        """
+        Atualiza a entrada do ponto; o rótulo só é renderizado de novo se o texto mudou.
+        """
+        x, y = p.mundo()
+        texto = f"({x:.2f}, {y:.2f})"
+        antes = self.pontos.get(p)
+        rotulo = antes[2] if antes is not None and antes[1] == texto else self.fonte.render(texto, True, COR_TEXTO)
+        self.pontos[p] = ((x, y), texto, rotulo)
+
+    def objeto(self, obj):
+        """
+        Atualiza a entrada do objeto e os rótulos dos pontos dele.
+        """
+        if isinstance(obj, Instancia):
+            # Cópia: a instância da cena continua acumulando matrizes
+            self.objetos[Instancia][id(obj)] = Instancia(obj.molde, obj.matriz)
+            return
+        self.objetos[type(obj)][id(obj)] = Instancia(obj.molde(), obj.matriz)
+        self.compostos[id(obj)] = obj
+        pontos = self.pontos
+        for p in obj.pontos():
+            if p in pontos:
+                self.ponto(p)
+
+    def transformados(self, alvos):
+        """
+        Atualiza objetos e pontos movidos por uma transformação. Objetos
+        `compartilhado` movem pontos de outros objetos, que também são refeitos.
+        """
+        for alvo in alvos:
+            if isinstance(alvo, Ponto):
+                if alvo in self.pontos:
+                    self.ponto(alvo)
+            else:
+                self.objeto(alvo)
+        if any(getattr(alvo, "compartilhado", False) for alvo in alvos):
+            for obj in list(self.compostos.values()):
+                if obj.compartilhado:
+                    self.objeto(obj)
+
+    def congelar(self):
+        """
+        Instantâneo imutável para a thread de desenho (tuplas com as entradas atuais).
+        """
+        obj = self.objetos
+        return Cena(
+            pontos=tuple(self.pontos.values()),
+            retas=tuple(obj[Reta].values()),
+            circs=tuple(obj[Circunferencia].values()),
+            poligonos=tuple(obj[Poligono].values()),
+            instancias=tuple(obj[Instancia].values()),
+        )
+
+def desenhar_cena(tela, cena):
+    """
+    Desenha grade e entidades de um instantâneo. Roda na thread de desenho.
+    Objetos comuns são desenhados pela forma do molde com a matriz (mesmos pixels
+    do objeto da cena); só as instâncias usam o raster do molde.
+    """
+    desenhar_canvas(tela)
+    desenhar_poligonos(tela, [inst.forma() for inst in cena.poligonos])
+    desenhar_instancias(tela, cena.instancias)
+    desenhar_retas(tela, [inst.forma() for inst in cena.retas])
+    desenhar_circs(tela, [inst.forma() for inst in cena.circs])
+    desenhar_pontos(tela, cena.pontos)
 
 def desenhar_previa_poligono(tela, vertices, pos_mouse, algo):
     """
     Desenha a prévia do polígono enquanto o usuário está adicionando vértices.
     """
     if not vertices: return
-    for i in range(len(vertices)-1):
-        Reta(vertices[i], vertices[i+1], algo).draw(tela, mundo_para_tela, color=COR_PREVIA)
+    # Arestas rasterizadas direto da tela: uma Reta temporária adotaria os vértices (Ponto.dono)
+    spans_aresta = spans_dda if algo==ALGO_DDA else spans_bresenham
+    tela_pts = pontos_para_tela(vertices)
+    for (x0, y0), (x1, y1) in zip(tela_pts, tela_pts[1:]):
+        desenhar_spans(tela, spans_aresta(x0, y0, x1, y1), COR_PREVIA)
     last=vertices[-1]
     ax, ay = mundo_para_tela(last.x, last.y)
     mx, my = pos_mouse
     if mx>=LARGURA_CANVAS: mx=LARGURA_CANVAS-1
     pg.draw.line(tela, COR_PREVIA, (ax,ay),(mx,my),ESP_GUIA)
 
+@lru_cache(maxsize=None)
+def superficie_dim():
+    """
+    Camada translúcida que escurece o canvas (seleção e modal), criada uma só vez.
+    """
+    dim = pg.Surface((LARGURA_CANVAS, ALTURA), pg.SRCALPHA); dim.fill(COR_DIM)
+    return dim
+
 def desenhar_retangulo_selec(tela, rect_screen):
     """
     Desenha o retângulo de seleção translúcido durante seleção de pontos.
     """
     if rect_screen is None: return
     r = rect_screen.copy(); r.normalize()
-    dim = pg.Surface((LARGURA_CANVAS, ALTURA), pg.SRCALPHA); dim.fill(COR_DIM); tela.blit(dim, (0,0))
+    tela.blit(superficie_dim(), (0,0))
     fill_surf = pg.Surface((max(r.w,1), max(r.h,1)), pg.SRCALPHA); fill_surf.fill(COR_SEL_FILL)
     tela.blit(fill_surf, r.topleft)
     pg.draw.rect(tela, COR_SEL_BORDA, r, width=2)
@@ -350,55 +642,86 @@ def desenhar_retangulo_selec(tela, rect_screen):
 # -------------------------
 # Helpers seleção por objeto
 # -------------------------
-def _objetos_como_conjuntos(retas, circs, poligonos):
+def caixa_mundo(rect_screen):
     """
-    Retorna lista de conjuntos de pontos, um por objeto composto (reta, circunf., polígono).
+    Retângulo de seleção da tela como (xmin, xmax, ymin, ymax) no mundo.
     """
-    grupos = []
-    for r in retas:
-        grupos.append({r.p1, r.p2})
-    for c in circs:
-        grupos.append({c.centro, c.borda})
-    for poly in poligonos:
-        grupos.append(set(poly.vertices))
-    return grupos
+    r = rect_screen.copy(); r.normalize()
+    (xw1, yw1) = tela_para_mundo(r.left,  r.top)
+    (xw2, yw2) = tela_para_mundo(r.right, r.bottom)
+    return (min(xw1, xw2), max(xw1, xw2), min(yw1, yw2), max(yw1, yw2))
 
-def pontos_transformaveis(pontos_sel, retas, circs, poligonos):
+def indice_selecao(pontos, retas, circs, poligonos, instancias):
+    """
+    Seleção incremental sobre a cena: os pontos (posições efetivas) seguidos dos
+    pontos de controle das instâncias, com um grupo por objeto composto.
+    Retorna (seleção, objetos na ordem dos grupos).
+    """
+    pos = {p: i for i, p in enumerate(pontos)}
+    coords = [p.mundo() for p in pontos]
+    grupos, objetos = [], []
+    for obj in (*retas, *circs, *poligonos):
+        pts = obj.pontos()
+        if all(p in pos for p in pts):  # ponto fora da lista nunca é selecionado
+            grupos.append([pos[p] for p in pts]); objetos.append(obj)
+    for inst in instancias:
+        ctrl = inst.pontos_controle()
+        grupos.append(list(range(len(coords), len(coords) + len(ctrl)))); objetos.append(inst)
+        coords += ctrl
+    xs = [x for x, _ in coords]; ys = [y for _, y in coords]
+    return SelecaoIncremental(xs, ys, grupos, TAM_CELULA_SELECAO / ESCALA), objetos
+
+def pontos_transformaveis(selecao, objetos, pontos):
     """
     Aplica a regra: só transforma objetos totalmente selecionados.
-    Retorna o conjunto de pontos que podem ser transformados.
+    Retorna o conjunto de pontos que podem ser transformados: os dos objetos
+    completos e os pontos "soltos" (que não pertencem a nenhum objeto) selecionados.
     """
-    S = set(pontos_sel)
-    grupos = _objetos_como_conjuntos(retas, circs, poligonos)
-
-    # união dos grupos totalmente contidos em S
-    transform = set()
-    for g in grupos:
-        if g.issubset(S):
-            transform.update(g)
-
-    # Pontos "soltos" (que não pertencem a nenhum objeto composto)
-    pontos_participantes = set().union(*grupos) if grupos else set()
-    for p in S:
-        if p not in pontos_participantes:
-            transform.add(p)
-
+    n = len(pontos)
+    transform = {pontos[i] for i in selecao.soltos_selecionados() if i < n}
+    for obj in objetos_transformaveis(selecao, objetos):
+        transform.update(obj.pontos())
     return transform
 
-def centroid(points):
+def objetos_transformaveis(selecao, objetos):
+    """
+    Retorna os objetos (reta, circunf., polígono, instância) totalmente contidos na seleção.
+    """
+    return [objetos[k] for k in sorted(selecao.completos)]
+
+def objeto_no_pixel(sx, sy, retas, circs, poligonos, instancias):
+    """
+    Objeto desenhado no pixel (sx, sy), com FOLGA_CLIQUE px de tolerância, pelo
+    teste de acerto exato nos spans. Procura do último desenhado para o primeiro.
+    """
+    for obj in (*reversed(circs), *reversed(retas)):
+        if obj.contem_pixel(mundo_para_tela, sx, sy, FOLGA_CLIQUE):
+            return obj
+    for obj in (*reversed(instancias), *reversed(poligonos)):
+        if obj.contem_pixel(mundo_para_tela, sx, sy, ESCALA, FOLGA_CLIQUE):
+            return obj
+    return None
+
+def centroid(points, instancias=()):
     """
     Calcula o centróide (média das coordenadas) de uma lista de pontos.
+    Cada instância conta como os pontos da sua forma base transformados.
     """
-    if not points: return (0.0, 0.0)
-    sx = sum(p.x for p in points); sy = sum(p.y for p in points); n = len(points)
+    coords = [p.mundo() for p in points]
+    sx = sum(x for x, _ in coords); sy = sum(y for _, y in coords); n = len(coords)
+    for inst in instancias:
+        (x, y), k = inst.centroide()
+        sx += k*x; sy += k*y; n += k
+    if not n: return (0.0, 0.0)
     return (sx/n, sy/n)
 
 # -------------------------
 # Modal de Transformações
 # -------------------------
-def abrir_menu_transform(posicao_referencia, pontos_transform):
+def abrir_menu_transform(posicao_referencia, pontos_transform, objetos=()):
     """
     Cria o estado do modal de transformações (translação, rotação, escala).
+    `objetos` são os objetos completos da seleção, usados na prévia (fantasma).
     """
     w, h = 420, 220
     x = min(max(10, posicao_referencia[0]), LARGURA_CANVAS - w - 10)
@@ -417,16 +740,188 @@ def abrir_menu_transform(posicao_referencia, pontos_transform):
 
     btn_ok = pg.Rect(x + w - 190, y + h - 50, 80, 34)
     btn_cancel = pg.Rect(x + w - 100, y + h - 50, 80, 34)
+    btn_inst = pg.Rect(x + 14, y + h - 50, 110, 34)
+    soltos = _pontos_soltos(pontos_transform, objetos)
 
     return {
         "rect": modal_rect,
         "inputs": {"dx": input_dx, "dy": input_dy, "ang": input_ang, "esc": input_esc},
         "btn_ok": btn_ok,
         "btn_cancel": btn_cancel,
-        "pivoto": centroid(list(pontos_transform)),
-        "pontos": list(pontos_transform)
+        "btn_inst": btn_inst,
+        "pivoto": centroid(list(pontos_transform), [o for o in objetos if isinstance(o, Instancia)]),
+        "pontos": list(pontos_transform),
+        "objetos": list(objetos),
+        "pontos_soltos": soltos,
+        "base_previa": base_previa(soltos, objetos),
+        "previa": None,
+    }
+
+def base_previa(soltos, objetos):
+    """
+    Geometria da prévia em arrays de coordenadas do mundo, montada uma vez por modal:
+    pontos soltos (N, 2), segmentos das retas e dos polígonos pequenos (M, 4),
+    circunferências (K, 3) = centro e raio, e os vértices dos polígonos grandes,
+    simplificados por faixa de escala em _segmentos_poligonos.
+    """
+    retas, circs, grandes = [], [], []
+    for obj in objetos:
+        if isinstance(obj, Instancia):
+            obj = obj.forma()
+        if isinstance(obj, Reta):
+            retas.append([c for p in obj.pontos_mundo() for c in p])
+        elif isinstance(obj, Circunferencia):
+            circs.append([*obj.pontos_mundo()[0], obj.raio])
+        elif len(obj.vertices) >= 2:
+            pts = obj.pontos_mundo()
+            if obj.fechado and len(pts) > 2:
+                pts.append(pts[0])
+            if len(pts) > VERTICES_SIMPL_PREVIA:
+                grandes.append(pts)
+            else:
+                retas.extend([*a, *b] for a, b in zip(pts, pts[1:]))
+    return {
+        "soltos": np.array([p.mundo() for p in soltos], dtype=float).reshape(-1, 2),
+        "retas": np.array(retas, dtype=float).reshape(-1, 4),
+        "circs": np.array(circs, dtype=float).reshape(-1, 3),
+        "poligonos": grandes,
+        "segs_poligonos": {},  # faixa de escala -> segmentos (M, 4), só deste modal
     }
 
+def _segmentos_poligonos(base, fator):
+    """
+    Segmentos das retas e de todos os polígonos da prévia para o fator de escala.
+    Os polígonos grandes são simplificados uma vez por faixa (potência de 2) do fator,
+    com a tolerância da faixa inferior: o erro fica abaixo de 1 px dentro dela.
+    """
+    lo, hi = FAIXAS_ESCALA_PREVIA
+    faixa = min(max(int(np.floor(np.log2(fator))), lo), hi) if fator > 0 else lo
+    cache = base["segs_poligonos"]
+    if faixa not in cache:
+        tol = 0.5 / (ESCALA * 2.0 ** faixa)
+        partes = [base["retas"]]
+        for pts in base["poligonos"]:
+            v = np.array(simplificar(pts, tol), dtype=float)
+            partes.append(np.hstack([v[:-1], v[1:]]))
+        cache[faixa] = np.vstack(partes)
+    return cache[faixa]
+
+def _pontos_soltos(pontos_transform, objetos):
+    """
+    Pontos transformáveis que não pertencem a nenhum dos objetos.
+    """
+    dos_objetos = set()
+    for obj in objetos:
+        dos_objetos.update(obj.pontos())
+    return [p for p in pontos_transform if p not in dos_objetos]
+
+def valores_transform(modal_state):
+    """
+    Lê (dx, dy, ang, esc) das caixas de entrada do modal.
+    """
+    ins = modal_state["inputs"]
+    return (ins["dx"].value(0.0), ins["dy"].value(0.0), ins["ang"].value(0.0), ins["esc"].value(1.0))
+
+def matriz_mundo_transform(modal_state):
+    """
+    Matriz afim (no mundo) da transformação combinada do modal:
+    a mesma sequência aplicada no OK (translação, rotação e escala no pivô).
+    """
+    dx, dy, ang, esc = valores_transform(modal_state)
+    pivo = modal_state["pivoto"]
+    return compor(Escala((), esc, pivo).matriz(), compor(Rotacao((), ang, pivo).matriz(), Translacao((), dx, dy).matriz()))
+
+def matriz_transform(modal_state):
+    """
+    A matriz de matriz_mundo_transform em coordenadas de tela.
+    """
+    cx, cy = LARGURA_CANVAS//2, ALTURA//2
+    return compor((ESCALA, 0.0, 0.0, -ESCALA, cx, cy), matriz_mundo_transform(modal_state))
+
+def instanciar_transform(modal_state):
+    """
+    Cópias dos objetos do modal como instâncias, já com a transformação do modal.
+    Objetos comuns viram moldes (um por objeto); instâncias reaproveitam o seu.
+    """
+    m = matriz_mundo_transform(modal_state)
+    novas = []
+    for obj in modal_state["objetos"]:
+        molde = obj.molde if isinstance(obj, Instancia) else obj.molde()
+        novas.append(Instancia(molde, compor(m, obj.matriz)))
+    return novas
+
+def _tela_lote(m, xy):
+    """
+    Aplica a matriz de tela em coordenadas (N, 2) e trunca para pixels, como int().
+    """
+    a, b, c, d, e, f = m
+    return np.trunc(xy @ np.array([[a, c], [b, d]]) + (e, f))
+
+def previa_transform(modal_state):
+    """
+    "Fantasma" dos objetos selecionados já transformados: (superfície, retângulo)
+    recortados à região ocupada, ou (None, None) se nada aparece no canvas.
+    Não altera as entidades: transforma em lote os arrays de base_previa e
+    rasteriza numa máscara. Só é refeito quando os valores mudam.
+    """
+    valores = valores_transform(modal_state)
+    cache = modal_state["previa"]
+    if cache is not None and cache[0] == valores:
+        return cache[1], cache[2]
+    m = matriz_transform(modal_state)
+    fator = abs(valores[3])
+    base = modal_state["base_previa"]
+
+    mascara = np.zeros((LARGURA_CANVAS, ALTURA), dtype=bool)
+    segs = _segmentos_poligonos(base, fator)
+    longos = marcar_segmentos(mascara, _tela_lote(m, segs.reshape(-1, 2)).reshape(-1, 4))
+    circs = base["circs"]
+    grandes = ()
+    if len(circs):
+        centros = _tela_lote(m, circs[:, :2])
+        raios = np.rint(circs[:, 2] * fator * ESCALA)
+        ok = np.isfinite(centros).all(axis=1) & np.isfinite(raios) & (raios > 0)
+        centros, raios = centros[ok].astype(np.intp), raios[ok].astype(np.intp)
+        fora = marcar_circunferencias(mascara, centros[:, 0], centros[:, 1], raios)
+        grandes = [(tuple(ct), int(r)) for ct, r in zip(centros[fora], raios[fora])]
+    # Pontos soltos: marcador quadrado de lado 2*RAIO_PONTO-1 em volta de cada pixel
+    soltos = _tela_lote(m, base["soltos"])
+    soltos = soltos[np.isfinite(soltos).all(axis=1)]
+    dentro = (soltos[:, 0] > -RAIO_PONTO) & (soltos[:, 0] < LARGURA_CANVAS + RAIO_PONTO - 1) & \
+             (soltos[:, 1] > -RAIO_PONTO) & (soltos[:, 1] < ALTURA + RAIO_PONTO - 1)
+    if dentro.any():
+        pad = RAIO_PONTO - 1
+        centros = np.zeros((LARGURA_CANVAS + 2*pad, ALTURA + 2*pad), dtype=bool)
+        xy = soltos[dentro].astype(np.intp) + pad
+        centros[xy[:, 0], xy[:, 1]] = True
+        mascara |= dilatar(centros, pad)[pad:pad + LARGURA_CANVAS, pad:pad + ALTURA]
+
+    colunas = np.flatnonzero(mascara.any(axis=1)); linhas = np.flatnonzero(mascara.any(axis=0))
+    rect = None
+    if len(colunas):
+        rect = pg.Rect(colunas[0], linhas[0], colunas[-1] - colunas[0] + 1, linhas[-1] - linhas[0] + 1)
+    if len(longos):
+        # Segmentos longos já vêm recortados ao canvas: a caixa sai dos extremos
+        xs, ys = longos[:, 0::2], longos[:, 1::2]
+        caixa = pg.Rect(xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1)
+        rect = caixa if rect is None else rect.union(caixa)
+    if grandes:
+        rect = pg.Rect(0, 0, LARGURA_CANVAS, ALTURA)
+    surf = None
+    if rect is not None:
+        surf = pg.Surface(rect.size, pg.SRCALPHA)
+        surf.fill(COR_FANTASMA[:3] + (0,))
+        alfa = pg.surfarray.pixels_alpha(surf)
+        alfa[mascara[rect.left:rect.right, rect.top:rect.bottom]] = COR_FANTASMA[3]
+        del alfa  # libera o lock da superfície
+        linha = pg.draw.line
+        for x0, y0, x1, y1 in (longos - (rect.x, rect.y, rect.x, rect.y)).tolist():
+            linha(surf, COR_FANTASMA, (x0, y0), (x1, y1))
+        for (cx, cy), r in grandes:
+            pg.draw.circle(surf, COR_FANTASMA, (cx - rect.x, cy - rect.y), r, 1)
+    modal_state["previa"] = (valores, surf, rect)
+    return surf, rect
+
 def desenhar_menu_transform(tela, fonte, modal_state):
     """
     Desenha o modal de transformações com campos de entrada e botões.
@@ -462,19 +957,38 @@ def desenhar_menu_transform(tela, fonte, modal_state):
     ca_s = fonte.render("Cancelar", True, (0,0,0))
     tela.blit(ca_s, ca_s.get_rect(center=modal_state["btn_cancel"].center))
 
+    if modal_state["objetos"]:
+        pg.draw.rect(tela, COR_BOTAO, modal_state["btn_inst"], border_radius=6)
+        pg.draw.rect(tela, (0,0,0), modal_state["btn_inst"], 1, border_radius=6)
+        in_s = fonte.render("Instanciar", True, (0,0,0))
+        tela.blit(in_s, in_s.get_rect(center=modal_state["btn_inst"].center))
+
 # -------------------------
 # Main
 # -------------------------
-def main():
+def main(fonte_eventos=None, limitar_fps=True, nuvem=None, tipo_nuvem="d", esperar_desenho=False):
     """
     Função principal do programa. Controla o loop de eventos, desenho e lógica de interação.
+    fonte_eventos substitui pg.event.get (gravação/reprodução de sessões, ver gravacao.py);
+    limitar_fps=False remove o teto de 60 quadros por segundo.
+    nuvem é o caminho de uma nuvem de pontos binária exibida como mapa de densidade na aba Nuvem.
+    esperar_desenho=True espera a thread de desenho concluir cada cena alterada antes de seguir
+    (medições); o retorno são as estatísticas de desenho do renderizador.
     """
     tela, relogio, fonte = inicializar()
+    mapa = None
+    if nuvem:
+        mapa = MapaDensidade(nuvem, LARGURA_CANVAS, ALTURA, (LARGURA_CANVAS//2, ALTURA//2), ESCALA, tipo_nuvem)
+        log.info("Nuvem %s: %d pontos", nuvem, mapa.total)
+    if fonte_eventos is None:
+        fonte_eventos = pg.event.get
 
     aba  = ABA_RETAS
     algo = ALGO_BRES
+    preencher = False
+    regra = REGRA_PAR_IMPAR
 
-    pontos=[]; retas=[]; circs=[]; poligonos=[]
+    pontos=[]; retas=[]; circs=[]; poligonos=[]; instancias=[]
     ponto_A=None; circ_centro=None; poliverts=[]
 
     # Seleção
@@ -482,80 +996,195 @@ def main():
     selec_inicio_screen = None
     selec_rect_screen = None
     pontos_selecionados = []
+    selecao_viva = None; objetos_selecao = []; versao_indice = None  # índice refeito quando a cena muda
 
     # Modal
     modal_open = False
     modal_state = None
 
+    # Quadro
+    danos = Danos()
+    tab_rects, ctrl_rects = {}, {}
+    pos_mouse = (0, 0)
+
+    # Cena desenhada em segundo plano; versao_cena muda a cada alteração das entidades
+    renderizador = RenderizadorAssincrono((LARGURA_CANVAS, ALTURA), desenhar_cena)
+    instantaneo = InstantaneoCena(fonte)
+    versao_cena = 0; versao_submetida = None; versao_exibida = None
+    danos_cena = []  # (versão, rect) esperando o quadro dessa versão ficar pronto
+
     def limpar_tudo():
         """
         Limpa todas as entidades e estados da interface, reiniciando o canvas.
         """
-        nonlocal pontos, retas, circs, poligonos, ponto_A, circ_centro, poliverts
+        nonlocal pontos, retas, circs, poligonos, instancias, ponto_A, circ_centro, poliverts
         nonlocal selecionando, selec_inicio_screen, selec_rect_screen, pontos_selecionados
         nonlocal modal_open, modal_state
-        pontos.clear(); retas.clear(); circs.clear(); poligonos.clear()
+        pontos.clear(); retas.clear(); circs.clear(); poligonos.clear(); instancias.clear()
+        instantaneo.limpar()
         ponto_A=None; circ_centro=None; poliverts=[]
         selecionando=False; selec_inicio_screen=None; selec_rect_screen=None; pontos_selecionados=[]
         modal_open=False; modal_state=None
+        danos.marcar_canvas(); mudou_cena(pg.Rect(0, 0, LARGURA_CANVAS, ALTURA))
         log.info("Canvas limpo")
 
-    rodando=True
+    def mudou_cena(rect):
+        """
+        Registra alteração nas entidades: a região é redesenhada quando o quadro com ela ficar pronto.
+        """
+        nonlocal versao_cena
+        versao_cena += 1
+        danos_cena.append((versao_cena, rect))
 
-    while rodando:
-        # --- Desenho da interface ---
-        desenhar_canvas(tela)
-        tab_rects, ctrl_rects = desenhar_painel(tela, fonte, aba, algo)
-        desenhar_poligonos(tela, poligonos)
-        desenhar_retas(tela, retas)
-        desenhar_circs(tela, circs)
-        desenhar_pontos(tela, fonte, pontos)
-        if pontos_selecionados:
+    def desenhar_camadas():
+        """
+        Desenha todas as camadas do quadro (respeitando o clip atual da tela).
+        Retorna os retângulos das abas e controles do painel.
+        """
+        nonlocal versao_exibida
+        rects_painel = desenhar_painel(tela, fonte, aba, algo, preencher, regra, mapa)
+        if aba==ABA_NUVEM:
+            # Modo visualizador: só grade + mapa de densidade
+            desenhar_canvas(tela)
+            if mapa is not None:
+                tela.blit(mapa.superficie(), (0,0))
+            return rects_painel
+        # Grade e entidades: último quadro concluído pela thread de desenho
+        with renderizador.quadro_pronto() as (quadro, versao):
+            if quadro is None:
+                desenhar_canvas(tela)
+            else:
+                tela.blit(quadro, (0,0))
+                versao_exibida = versao
+        if selecionando and selecao_viva is not None:
+            n = len(pontos)
+            desenhar_pontos_selecionados(tela, [pontos[i] for i in selecao_viva.selecionados if i < n])
+        elif pontos_selecionados:
             desenhar_pontos_selecionados(tela, pontos_selecionados)
         if aba==ABA_POLI:
-            desenhar_previa_poligono(tela, poliverts, pg.mouse.get_pos(), algo)
+            desenhar_previa_poligono(tela, poliverts, pos_mouse, algo)
         if aba==ABA_TRANSF and selecionando and selec_rect_screen is not None:
             desenhar_retangulo_selec(tela, selec_rect_screen)
         if modal_open and modal_state:
             # Escurece fundo e desenha modal
-            dim = pg.Surface((LARGURA_CANVAS, ALTURA), pg.SRCALPHA); dim.fill(COR_DIM); tela.blit(dim, (0,0))
+            tela.blit(superficie_dim(), (0,0))
+            fantasma, rect_fantasma = previa_transform(modal_state)
+            if fantasma is not None:
+                tela.blit(fantasma, rect_fantasma)
             desenhar_menu_transform(tela, fonte, modal_state)
-        pg.display.flip(); relogio.tick(60)
+        return rects_painel
+
+    def rect_guia():
+        """
+        Retângulo da linha-guia da prévia do polígono (último vértice -> mouse).
+        """
+        if aba != ABA_POLI or not poliverts: return None
+        last = poliverts[-1]
+        mx, my = pos_mouse
+        return rect_segmento(mundo_para_tela(last.x, last.y), (min(mx, LARGURA_CANVAS-1), my))
+
+    rodando=True
+
+    while rodando:
+        # --- Cena: envia instantâneo novo e recebe quadros concluídos ---
+        if versao_cena != versao_submetida:
+            renderizador.submeter(instantaneo.congelar(), versao_cena)
+            versao_submetida = versao_cena
+            if esperar_desenho:
+                renderizador.aguardar(versao_cena)
+        versao_pronta = renderizador.versao_pronta
+        if versao_pronta is not None:
+            if versao_exibida is None:
+                danos.marcar_canvas()
+            if danos_cena and danos_cena[0][0] <= versao_pronta:
+                for v, r in danos_cena:
+                    if v <= versao_pronta: danos.marcar(r)
+                danos_cena[:] = [(v, r) for v, r in danos_cena if v > versao_pronta]
+
+        # --- Desenho da interface (só regiões danificadas) ---
+        if mapa is not None and not mapa.concluido:
+            mapa.processar()
+            if aba==ABA_NUVEM:
+                danos.marcar_painel()
+                if mapa.imagem_desatualizada(): danos.marcar_canvas()
+        total, rects = danos.coletar()
+        if total:
+            tela.set_clip(None)
+            tab_rects, ctrl_rects = desenhar_camadas()
+            pg.display.flip()
+        elif rects:
+            # Um único desenho das camadas, recortado à união das regiões; só elas são apresentadas
+            tela.set_clip(rects[0].unionall(rects[1:]))
+            tab_rects, ctrl_rects = desenhar_camadas()
+            tela.set_clip(None)
+            pg.display.update(rects)
+        if limitar_fps:
+            relogio.tick(60)
 
 
         # --- Loop de eventos ---
-        for ev in pg.event.get():
+        for ev in fonte_eventos():
             if ev.type==pg.QUIT:
                 rodando=False
                 continue
+            if ev.type in (pg.VIDEOEXPOSE, pg.WINDOWEXPOSED):
+                danos.marcar_tudo()
+            if ev.type==pg.MOUSEMOTION:
+                guia_antes = rect_guia()
+                pos_mouse = ev.pos
+                if guia_antes is not None:
+                    danos.marcar(guia_antes); danos.marcar(rect_guia())
 
             # Modal consome eventos enquanto aberto
             if modal_open and modal_state:
+                valores_antes = valores_transform(modal_state)
                 for ib in modal_state["inputs"].values():
-                    ib.handle_event(ev)
+                    if ib.handle_event(ev):
+                        danos.marcar(ib.rect)
+                if valores_transform(modal_state) != valores_antes:
+                    # Prévia mudou: redesenha só onde estava e onde vai ficar
+                    if modal_state["previa"] is None:
+                        danos.marcar_canvas()
+                    else:
+                        danos.marcar(modal_state["previa"][2])
+                        danos.marcar(previa_transform(modal_state)[1])
 
                 if ev.type == pg.MOUSEBUTTONDOWN and ev.button == 1:
                     if modal_state["btn_ok"].collidepoint(ev.pos):
-                        dx  = modal_state["inputs"]["dx"].value(0.0)
-                        dy  = modal_state["inputs"]["dy"].value(0.0)
-                        ang = modal_state["inputs"]["ang"].value(0.0)
-                        esc = modal_state["inputs"]["esc"].value(1.0)
+                        dx, dy, ang, esc = valores_transform(modal_state)
                         pts = modal_state["pontos"]
                         cx, cy = modal_state["pivoto"]
 
-                        if pts:
+                        if pts or modal_state["objetos"]:
                             log.info(f"Aplicando transformações: dx={dx}, dy={dy}, ang={ang}, esc={esc}, n_pontos={len(pts)}")
-                            Translacao(pts, dx, dy).aplicar()
-                            Rotacao(pts, ang, (cx, cy)).aplicar()
-                            Escala(pts, esc, (cx, cy)).aplicar()
+                            # Objetos só acumulam a matriz; pontos soltos são movidos na hora
+                            alvos = modal_state["objetos"] + modal_state["pontos_soltos"]
+                            Translacao(alvos, dx, dy).aplicar()
+                            Rotacao(alvos, ang, (cx, cy)).aplicar()
+                            Escala(alvos, esc, (cx, cy)).aplicar()
+                            instantaneo.transformados(alvos)
+                            mudou_cena(pg.Rect(0, 0, LARGURA_CANVAS, ALTURA))
+                        modal_open=False; modal_state=None
+                        danos.marcar_canvas()
+
+                    elif modal_state["objetos"] and modal_state["btn_inst"].collidepoint(ev.pos):
+                        novas = instanciar_transform(modal_state)
+                        instancias.extend(novas)
+                        for inst in novas: instantaneo.objeto(inst)
+                        log.info("%d instâncias criadas (%d moldes distintos no total)", len(novas),
+                                 len({id(inst.molde) for inst in instancias}))
+                        mudou_cena(pg.Rect(0, 0, LARGURA_CANVAS, ALTURA))
                         modal_open=False; modal_state=None
+                        danos.marcar_canvas()
 
                     elif modal_state["btn_cancel"].collidepoint(ev.pos):
                         modal_open=False; modal_state=None
+                        danos.marcar_canvas()
                     else:
                         # Fecha modal se clicar fora dele (mas dentro do canvas)
                         if not modal_state["rect"].collidepoint(ev.pos) and ev.pos[0] < LARGURA_CANVAS:
                             modal_open=False; modal_state=None
+                            danos.marcar_canvas()
                 continue
 
             # --- UI normal ---
@@ -570,6 +1199,7 @@ def main():
                             aba=key; ponto_A=None; circ_centro=None; poliverts=[]
                             selecionando=False; selec_inicio_screen=None; selec_rect_screen=None
                             modal_open=False; modal_state=None
+                            danos.marcar_tudo()
                             trocou=True; break
                     if trocou: continue
 
@@ -577,16 +1207,31 @@ def main():
                         limpar_tudo(); continue
                     if aba==ABA_RETAS:
                         if "DDA" in ctrl_rects and ctrl_rects["DDA"].collidepoint(sx,sy):
-                            algo=ALGO_DDA; continue
+                            algo=ALGO_DDA; danos.marcar_painel(); continue
                         if "BRES" in ctrl_rects and ctrl_rects["BRES"].collidepoint(sx,sy):
-                            algo=ALGO_BRES; continue
+                            algo=ALGO_BRES; danos.marcar_painel(); continue
+                    if aba==ABA_POLI:
+                        if "PREENCH" in ctrl_rects and ctrl_rects["PREENCH"].collidepoint(sx,sy):
+                            preencher = not preencher; danos.marcar_painel(); continue
+                        if "REGRA" in ctrl_rects and ctrl_rects["REGRA"].collidepoint(sx,sy):
+                            regra = REGRA_NAO_NULO if regra==REGRA_PAR_IMPAR else REGRA_PAR_IMPAR
+                            danos.marcar_painel(); continue
                     continue
 
                 # Clique no canvas
+                if aba==ABA_NUVEM:
+                    continue  # visualizador: o canvas não cria entidades
                 if aba==ABA_TRANSF and ev.button==1:
                     selecionando = True
                     selec_inicio_screen = (sx, sy)
                     selec_rect_screen = pg.Rect(sx, sy, 0, 0)
+                    if versao_indice != versao_cena:
+                        selecao_viva, objetos_selecao = indice_selecao(pontos, retas, circs, poligonos, instancias)
+                        versao_indice = versao_cena
+                    else:
+                        selecao_viva.limpar()
+                    selecao_viva.atualizar(caixa_mundo(selec_rect_screen))
+                    danos.marcar_canvas()
                     continue
 
                 x,y = tela_para_mundo(sx,sy)
@@ -594,11 +1239,15 @@ def main():
 
                 if ev.button==1:
                     pontos.append(novo_p)
+                    instantaneo.ponto(novo_p)
+                    mudou_cena(rect_ponto(fonte, novo_p))
                     if aba==ABA_RETAS:
                         if ponto_A is None:
                             ponto_A=novo_p
                         else:
                             retas.append(Reta(ponto_A, novo_p, algo))
+                            instantaneo.objeto(retas[-1])
+                            mudou_cena(rect_entidade(retas[-1]))
                             ponto_A=None
                     elif aba==ABA_CIRC:
                         if circ_centro is None:
@@ -606,16 +1255,28 @@ def main():
                         else:
                             # segundo clique define ponto de borda
                             circs.append(Circunferencia(circ_centro, novo_p))
+                            instantaneo.objeto(circs[-1])
+                            mudou_cena(rect_entidade(circs[-1]))
                             circ_centro=None
                     elif aba==ABA_POLI:
+                        danos.marcar(rect_guia())
                         poliverts.append(novo_p)
+                        danos.marcar(rect_guia())
 
                 elif ev.button == 3:
                     if aba == ABA_POLI and len(poliverts) >= 2:
-                        novo_poly = Poligono(vertices=poliverts.copy(), fechado=False)
+                        if preencher and len(poliverts) >= 3:
+                            novo_poly = Poligono(vertices=poliverts.copy(), fechado=True, preenchido=True, regra=regra)
+                        else:
+                            novo_poly = Poligono(vertices=poliverts.copy(), fechado=False)
                         poligonos.append(novo_poly)
+                        instantaneo.objeto(novo_poly)
+                        mudou_cena(rect_entidade(novo_poly)); danos.marcar(rect_guia())
                         poliverts.clear()
-                        log.info("Polígono aberto criado com %d vértices", len(novo_poly.vertices))
+                        if novo_poly.preenchido:
+                            log.info("Polígono preenchido (%s) criado com %d vértices", regra, len(novo_poly.vertices))
+                        else:
+                            log.info("Polígono aberto criado com %d vértices", len(novo_poly.vertices))
 
             elif ev.type==pg.MOUSEMOTION:
                 # Atualiza retângulo de seleção durante arrasto
@@ -627,34 +1288,51 @@ def main():
                     top    = min(sy0, sy1)
                     width  = abs(sx1 - sx0)
                     height = abs(sy1 - sy0)
+                    # A folga cobre também o destaque dos pontos que entram ou saem
+                    folga = 2*(RAIO_PONTO + 3)
+                    danos.marcar(selec_rect_screen.inflate(folga, folga))
                     selec_rect_screen.update(left, top, width, height)
+                    danos.marcar(selec_rect_screen.inflate(folga, folga))
+                    selecao_viva.atualizar(caixa_mundo(selec_rect_screen))
 
             elif ev.type==pg.MOUSEBUTTONUP:
                 # Finaliza seleção de pontos para transformação
                 if aba==ABA_TRANSF and ev.button==1 and selecionando and selec_rect_screen is not None:
                     selecionando=False
                     r = selec_rect_screen.copy(); r.normalize()
-                    (xw1, yw1) = tela_para_mundo(r.left,  r.top)
-                    (xw2, yw2) = tela_para_mundo(r.right, r.bottom)
-                    xmin, xmax = (xw1, xw2) if xw1<=xw2 else (xw2, xw1)
-                    ymin, ymax = (yw1, yw2) if yw1<=yw2 else (yw2, yw1)
-                    pontos_selecionados = [p for p in pontos if (xmin <= p.x <= xmax and ymin <= p.y <= ymax)]
+                    # Reaproveita o estado mantido durante o arrasto
+                    selecao_viva.atualizar(caixa_mundo(r))
+                    n = len(pontos)
+                    pontos_selecionados = [pontos[i] for i in sorted(selecao_viva.selecionados) if i < n]
                     log.info("Seleção concluída: %d pontos (brutos)", len(pontos_selecionados))
                     selec_inicio_screen=None
                     selec_rect_screen=None
+                    danos.marcar_canvas()
 
                     # aplica regra: somente objetos completos
-                    pts_ok = pontos_transformaveis(pontos_selecionados, retas, circs, poligonos)
-                    log.info("Pontos transformáveis (objetos completos): %d", len(pts_ok))
-
-                    if pts_ok:
+                    pts_ok = pontos_transformaveis(selecao_viva, objetos_selecao, pontos)
+                    objs = objetos_transformaveis(selecao_viva, objetos_selecao)
+                    if r.w == 0 and r.h == 0 and not pts_ok:
+                        # Clique sem arrasto: escolhe o objeto sob o cursor
+                        obj = objeto_no_pixel(r.x, r.y, retas, circs, poligonos, instancias)
+                        if obj is not None:
+                            objs = [obj]; pts_ok = set(obj.pontos())
+                            pontos_selecionados = list(pts_ok)
+                    log.info("Pontos transformáveis (objetos completos): %d; objetos: %d", len(pts_ok), len(objs))
+
+                    if pts_ok or objs:
                         ref_pos = (r.right + 10, r.top)
                         modal_open = True
-                        modal_state = abrir_menu_transform(ref_pos, pts_ok)
+                        modal_state = abrir_menu_transform(ref_pos, pts_ok, objs)
                     else:
                         log.info("Nenhum objeto completo na seleção — modal não aberto.")
 
-    pg.quit(); sys.exit()
+    renderizador.parar()
+    pg.quit()
+    return renderizador.estatisticas()
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    caminho_nuvem = args[args.index("--nuvem") + 1] if "--nuvem" in args[:-1] else None
+    main(nuvem=caminho_nuvem, tipo_nuvem="f" if "--f32" in args else "d")
+    sys.exit()
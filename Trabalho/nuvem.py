@@ -0,0 +1,150 @@
+"""
+Mapa de densidade para nuvens de pontos grandes em disco.
+
+O arquivo é um vetor binário de floats (x0, y0, x1, y1, ...) em ordem de bytes
+nativa, float64 ('d') por padrão ou float32 ('f'). Ele é mapeado em memória
+(mmap) e percorrido em blocos; cada ponto vira um incremento num histograma 2D
+do tamanho do canvas, com a mesma conversão de mundo_para_tela. Os blocos são
+convertidos com numpy direto sobre o mmap (sem cópia para objetos Python). A
+memória usada é a do histograma e da imagem, qualquer que seja o tamanho do arquivo.
+"""
+import mmap
+import os
+import time
+
+import numpy as np
+import pygame as pg
+
+TAM_BLOCO = 65536          # pontos por bloco
+SATURACAO = 65535          # contagens acima disso usam a cor máxima
+INTERVALO_IMAGEM = 1.0     # s entre reconstruções da imagem durante a leitura
+
+# Paleta (contagem baixa -> alta); índice 0 é reservado para "sem pontos"
+PARADAS_PALETA = [(20, 10, 80), (120, 20, 130), (220, 60, 60), (250, 160, 30), (255, 250, 180)]
+
+
+def _paleta():
+    """Nível (0..255) -> pixel RGBA, interpolando PARADAS_PALETA; o nível 0 fica transparente."""
+    paradas = np.array(PARADAS_PALETA, dtype=float)
+    t = np.arange(255) / 254 * (len(paradas) - 1)
+    rgba = np.zeros((256, 4), dtype=np.uint8)
+    for c in range(3):
+        rgba[1:, c] = np.interp(t, np.arange(len(paradas)), paradas[:, c])
+    rgba[1:, 3] = 230
+    return rgba
+
+
+PALETA_RGBA = _paleta()
+
+
+class MapaDensidade:
+    """
+    Histograma 2D de uma nuvem de pontos mapeada em memória, preenchido aos
+    poucos por processar() e exibido como imagem RGBA com paleta logarítmica.
+    `origem` e `escala` são os mesmos parâmetros de mundo_para_tela.
+    """
+    def __init__(self, caminho, largura, altura, origem, escala, tipo="d"):
+        self.caminho = caminho
+        self.largura, self.altura = largura, altura
+        self.origem, self.escala = origem, escala
+        self.hist = np.zeros(largura * altura, dtype=np.uint32)
+        self.processados = 0
+        self._tipo = np.dtype(tipo)
+        self._arquivo = open(caminho, "rb")
+        tam_par = 2 * self._tipo.itemsize
+        n_bytes = os.fstat(self._arquivo.fileno()).st_size // tam_par * tam_par
+        self.total = n_bytes // tam_par
+        self._mm = None
+        self._visoes = []  # memoryviews sobre o mmap, liberadas em fechar()
+        self._coords = None
+        if n_bytes:
+            self._mm = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+            base = memoryview(self._mm)
+            recorte = base[:n_bytes]
+            self._coords = recorte.cast(tipo)
+            self._visoes = [self._coords, recorte, base]
+        self._superficie = None
+        self._rgba = None  # buffer compartilhado com a superfície
+        self._sujo = True
+        self._t_imagem = 0.0
+        if not self.total:
+            self.fechar()
+
+    @property
+    def concluido(self):
+        return self.processados >= self.total
+
+    def processar(self, orcamento_s=0.008):
+        """
+        Acumula blocos no histograma até gastar `orcamento_s` segundos.
+        Retorna quantos pontos foram processados nesta chamada.
+        """
+        if self.concluido:
+            return 0
+        w, h = self.largura, self.altura
+        cx, cy = self.origem
+        esc = self.escala
+        hist = self.hist
+        inicio = self.processados
+        limite = time.perf_counter() + orcamento_s
+        while self.processados < self.total and time.perf_counter() < limite:
+            i = self.processados
+            n = min(TAM_BLOCO, self.total - i)
+            bloco = self._coords[2 * i: 2 * (i + n)]
+            xy = np.frombuffer(bloco, dtype=self._tipo).astype(np.float64, copy=False)  # contas em double, como no Python
+            fx = cx + xy[0::2] * esc
+            fy = cy - xy[1::2] * esc
+            # int() trunca em direção a zero: (-1, w) em float cai em 0..w-1 (NaN fica de fora)
+            dentro = (fx > -1) & (fx < w) & (fy > -1) & (fy < h)
+            idx = fy[dentro].astype(np.intp) * w + fx[dentro].astype(np.intp)
+            np.add(hist, np.bincount(idx, minlength=hist.size), out=hist, casting="unsafe")
+            del xy, fx, fy, dentro, idx  # o bloco só pode ser liberado sem arrays apontando para ele
+            bloco.release()
+            self.processados = i + n
+        if self.processados != inicio:
+            self._sujo = True
+        if self.concluido:
+            self.fechar()
+        return self.processados - inicio
+
+    def imagem_desatualizada(self):
+        """
+        True se superficie() vai reconstruir a imagem: há pontos novos e, durante
+        a leitura, já se passaram INTERVALO_IMAGEM segundos desde a última.
+        """
+        if self._superficie is None:
+            return True
+        return self._sujo and (self.concluido or time.perf_counter() - self._t_imagem >= INTERVALO_IMAGEM)
+
+    def superficie(self):
+        """
+        Imagem RGBA do mapa (transparente onde não há pontos).
+        """
+        if self.imagem_desatualizada():
+            self._superficie = self._montar_imagem()
+            self._sujo = False
+            self._t_imagem = time.perf_counter()
+        return self._superficie
+
+    def _montar_imagem(self):
+        maximo = min(int(self.hist.max(initial=0)), SATURACAO)
+        # Nível 1..255 em escala log; 0 fica para pixel vazio
+        niveis = np.zeros(maximo + 1, dtype=np.uint8)
+        if maximo > 0:
+            c = np.arange(1, maximo + 1)
+            niveis[1:] = 1 + np.minimum(254, (254 * np.log1p(c) / np.log1p(maximo)).astype(np.intp))
+        rgba = PALETA_RGBA[niveis[np.minimum(self.hist, maximo)]]
+        self._rgba = rgba
+        return pg.image.frombuffer(rgba, (self.largura, self.altura), "RGBA")
+
+    def fechar(self):
+        """
+        Libera o mapeamento do arquivo (o histograma continua disponível).
+        """
+        for v in self._visoes:
+            v.release()
+        self._visoes = []; self._coords = None
+        if self._mm is not None:
+            self._mm.close(); self._mm = None
+        if not self._arquivo.closed:
+            self._arquivo.close()
@@ -0,0 +1,349 @@
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+import pygame as pg
+
+# Um span é uma corrida horizontal de pixels: (y, x_inicio, x_fim), inclusivo.
+# Listas de spans são tuplas ordenadas por (y, x_inicio), sem sobreposição.
+Span = Tuple[int, int, int]
+Spans = Tuple[Span, ...]
+Color = Tuple[int, int, int]
+
+TAM_CACHE_RASTER = 8192  # nº de primitivas rasterizadas guardadas no cache
+
+
+def spans_de_pixels(pixels: Iterable[Tuple[int, int]]) -> Spans:
+    """Compacta pixels (x, y) em spans ordenados, descartando repetidos."""
+    spans = []
+    y_at = x0 = x1 = None
+    for y, x in sorted({(y, x) for x, y in pixels}):
+        if y == y_at and x == x1 + 1:
+            x1 = x
+            continue
+        if y_at is not None:
+            spans.append((y_at, x0, x1))
+        y_at, x0, x1 = y, x, x
+    if y_at is not None:
+        spans.append((y_at, x0, x1))
+    return tuple(spans)
+
+
+def unir_spans(*listas: Spans) -> Spans:
+    """Une várias listas de spans numa só, fundindo corridas que se tocam."""
+    spans = []
+    for y, a, b in sorted(s for lst in listas for s in lst):
+        if spans and spans[-1][0] == y and a <= spans[-1][2] + 1:
+            if b > spans[-1][2]:
+                spans[-1] = (y, spans[-1][1], b)
+        else:
+            spans.append((y, a, b))
+    return tuple(spans)
+
+
+# -------------------------
+# Rasterizadores (com cache)
+# -------------------------
+@lru_cache(maxsize=TAM_CACHE_RASTER)
+def spans_dda(x0: int, y0: int, x1: int, y1: int) -> Spans:
+    """Pixels da reta pelo DDA, como spans."""
+    x0_f, y0_f = float(x0), float(y0)
+    dx, dy = float(x1) - x0_f, float(y1) - y0_f
+    steps = int(max(abs(dx), abs(dy)))
+    if steps == 0:
+        return ((y0, x0, x0),)
+    inc_x, inc_y = dx / steps, dy / steps
+    x, y = x0_f, y0_f
+    pixels = []
+    for _ in range(steps + 1):
+        pixels.append((int(round(x)), int(round(y))))
+        x += inc_x; y += inc_y
+    return spans_de_pixels(pixels)
+
+
+@lru_cache(maxsize=TAM_CACHE_RASTER)
+def spans_bresenham(x0: int, y0: int, x1: int, y1: int) -> Spans:
+    """Pixels da reta por Bresenham, como spans."""
+    x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    if steep: x0, y0, x1, y1 = y0, x0, y1, x1
+    if x0 > x1: x0, x1, y0, y1 = x1, x0, y1, y0
+    dx = x1 - x0; dy = abs(y1 - y0)
+    err = dx // 2; y_step = 1 if y0 < y1 else -1; y = y0
+    if steep:
+        # Cada passo cai numa linha de tela diferente: um span por pixel
+        spans = []
+        for x in range(x0, x1 + 1):
+            spans.append((x, y, y))
+            err -= dy
+            if err < 0:
+                y += y_step; err += dx
+        return tuple(spans)
+    # Caso raso: pixels consecutivos na mesma linha formam uma corrida
+    spans = []
+    inicio = x0
+    for x in range(x0, x1 + 1):
+        err -= dy
+        if err < 0:
+            spans.append((y, inicio, x))
+            inicio = x + 1
+            y += y_step; err += dx
+    if inicio <= x1:
+        spans.append((y, inicio, x1))
+    return tuple(sorted(spans))
+
+
+@lru_cache(maxsize=TAM_CACHE_RASTER)
+def spans_circunferencia(cx: int, cy: int, r: int) -> Spans:
+    """Pixels da circunferência pelo ponto médio (simetria de 8 octantes), como spans."""
+    if r <= 0:
+        return ()
+    pixels = []
+    x, y = 0, r
+    p = 1 - r
+    while True:
+        pixels += [(cx + x, cy + y), (cx - x, cy + y), (cx + x, cy - y), (cx - x, cy - y),
+                   (cx + y, cy + x), (cx - y, cy + x), (cx + y, cy - x), (cx - y, cy - x)]
+        if not x < y:
+            break
+        x += 1
+        if p < 0:
+            p += 2 * x + 1
+        else:
+            y -= 1
+            p += 2 * (x - y) + 1
+    return spans_de_pixels(pixels)
+
+
+# -------------------------
+# Consumidores de spans
+# -------------------------
+def recortar_spans(spans: Spans, largura: int, altura: int) -> Spans:
+    """Recorta os spans ao retângulo [0, largura) x [0, altura)."""
+    saida = []
+    for y, a, b in spans:
+        if 0 <= y < altura and b >= 0 and a < largura:
+            saida.append((y, max(a, 0), min(b, largura - 1)))
+    return tuple(saida)
+
+
+def desenhar_spans(surface: pg.Surface, spans: Spans, color: Color) -> None:
+    """Escreve os spans na superfície, uma chamada de fill por corrida.
+
+    Respeita o clip da superfície, como set_at. O recorte é feito aqui porque
+    fill com retângulos que começam fora da superfície pinta pixels errados.
+    """
+    clip = surface.get_clip()
+    xmin, xmax = clip.left, clip.right - 1
+    ymin, ymax = clip.top, clip.bottom - 1
+    fill = surface.fill
+    for y, a, b in spans:
+        if ymin <= y <= ymax and b >= xmin and a <= xmax:
+            if a < xmin: a = xmin
+            if b > xmax: b = xmax
+            fill(color, (a, y, b - a + 1, 1))
+
+
+def contem_pixel(spans: Spans, x: int, y: int, folga: int = 0) -> bool:
+    """Teste de acerto exato: algum pixel dos spans está a até `folga` pixels de (x, y)?
+
+    A vizinhança é o quadrado [x-folga, x+folga] x [y-folga, y+folga]; com
+    folga 0, o pixel (x, y) pertence aos spans? Uma busca binária por linha.
+    """
+    for yy in range(y - folga, y + folga + 1):
+        # Último span da linha que começa até x+folga: é o que vai mais à direita
+        i = bisect_right(spans, (yy, x + folga, float("inf"))) - 1
+        if i >= 0:
+            sy, _, b = spans[i]
+            if sy == yy and b >= x - folga:
+                return True
+    return False
+
+
+# -------------------------
+# Preenchimento por scanline
+# -------------------------
+def spans_preenchimento(vertices: Sequence[Tuple[int, int]], regra: str = "PAR_IMPAR",
+                        y_min: int | None = None, y_max: int | None = None) -> Spans:
+    """Spans do interior do polígono fechado por varredura (scanline).
+
+    Usa tabela de arestas (ET) ordenada pelo y inicial e tabela de arestas
+    ativas (AET) atualizada incrementalmente, amostrando cada linha de pixels
+    em y inteiro com arestas semiabertas [y_ini, y_fim). Um pixel x é pintado
+    se a interseção à esquerda cai em x ou antes (ceil), com aritmética inteira
+    exata. `regra` é "PAR_IMPAR" (even-odd) ou "NAO_NULO" (nonzero winding).
+    `y_min`/`y_max` limitam as linhas geradas (ex.: altura da tela), então o
+    custo é proporcional às linhas visíveis mais o nº de arestas.
+    """
+    n = len(vertices)
+    if n < 3:
+        return ()
+    # ET: y inicial -> arestas [x da interseção (ceil), x inicial, numerador, dx, dy, y final, sentido]
+    et: Dict[int, list] = {}
+    for i in range(n):
+        (xa, ya), (xb, yb) = vertices[i], vertices[(i + 1) % n]
+        if ya == yb:
+            continue  # arestas horizontais não cruzam linhas de amostragem
+        sentido = 1
+        if ya > yb:
+            xa, ya, xb, yb = xb, yb, xa, ya
+            sentido = -1
+        et.setdefault(ya, []).append([xa, xa, 0, xb - xa, yb - ya, yb, sentido])
+    linhas = sorted(et)
+    if not linhas:
+        return ()
+    y = linhas[0] if y_min is None else max(linhas[0], y_min)
+    y_fim = max(a[5] for lst in et.values() for a in lst)
+    if y_max is not None:
+        y_fim = min(y_fim, y_max + 1)
+    nao_nulo = regra.upper() == "NAO_NULO"
+
+    aet: list = []
+    proxima = 0
+    # Arestas que começam acima da primeira linha entram já avançadas até ela
+    while proxima < len(linhas) and linhas[proxima] <= y:
+        y0 = linhas[proxima]
+        for aresta in et[y0]:
+            if aresta[5] > y:
+                aresta[2] = aresta[3] * (y - y0)
+                aet.append(aresta)
+        proxima += 1
+
+    spans = []
+    while y < y_fim:
+        if proxima < len(linhas) and linhas[proxima] == y:
+            aet.extend(et[y])
+            proxima += 1
+        aet = [a for a in aet if a[5] > y]
+        if not aet:
+            if proxima >= len(linhas):
+                break
+            y = linhas[proxima]
+            continue
+        for a in aet:
+            a[0] = a[1] - (-a[2] // a[4])
+        aet.sort()
+        if nao_nulo:
+            enrolamento = 0
+            for k in range(len(aet) - 1):
+                enrolamento += aet[k][6]
+                if enrolamento != 0 and aet[k][0] < aet[k + 1][0]:
+                    spans.append((y, aet[k][0], aet[k + 1][0] - 1))
+        else:
+            for k in range(0, len(aet) - 1, 2):
+                if aet[k][0] < aet[k + 1][0]:
+                    spans.append((y, aet[k][0], aet[k + 1][0] - 1))
+        for a in aet:
+            a[2] += a[3]
+        y += 1
+    return unir_spans(tuple(spans))
+
+
+# -------------------------
+# Rasterização em lote (máscaras numpy)
+# -------------------------
+# Máscaras são arrays bool (largura, altura) indexados [x, y], como pg.surfarray.
+RAIO_MAX_LOTE = 8192  # circunferências maiores ficam com quem chama
+PASSOS_MAX_LOTE = 64  # segmentos mais longos ficam com quem chama: pg.draw.line custa menos por pixel
+
+
+def recortar_segmentos(segs: np.ndarray, largura: int, altura: int) -> np.ndarray:
+    """Recorta segmentos (M, 4) = (x0, y0, x1, y1) a [0, largura-1] x [0, altura-1] (Liang–Barsky em lote).
+
+    Retorna só os trechos visíveis; segmentos com coordenadas não finitas são descartados.
+    """
+    xs, ys = segs[:, 0::2], segs[:, 1::2]
+    inteiros = ((xs >= 0) & (xs <= largura - 1) & (ys >= 0) & (ys <= altura - 1)).all(axis=1)
+    resto = segs[~inteiros]
+    resto = resto[np.isfinite(resto).all(axis=1)]
+    if not len(resto):
+        return segs[inteiros]
+    x0, y0, x1, y1 = resto.T
+    dx, dy = x1 - x0, y1 - y0
+    t0 = np.zeros(len(resto)); t1 = np.ones(len(resto))
+    visivel = np.ones(len(resto), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x0), (dx, largura - 1 - x0), (-dy, y0), (dy, altura - 1 - y0)):
+            visivel &= (p != 0) | (q >= 0)
+            r = q / p
+            t0 = np.where(p < 0, np.maximum(t0, r), t0)
+            t1 = np.where(p > 0, np.minimum(t1, r), t1)
+    visivel &= t0 <= t1
+    recortados = np.stack([x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy], axis=1)[visivel]
+    return np.concatenate([segs[inteiros], recortados])
+
+
+def marcar_segmentos(mascara: np.ndarray, segs: np.ndarray) -> np.ndarray:
+    """Marca na máscara os pixels dos segmentos (M, 4), amostrados como no DDA (um por passo do eixo maior).
+
+    Retorna, já recortados e em pixels inteiros, os segmentos com mais de
+    PASSOS_MAX_LOTE passos, que não foram marcados.
+    """
+    w, h = mascara.shape
+    segs = np.rint(recortar_segmentos(np.asarray(segs, dtype=float).reshape(-1, 4), w, h)).astype(np.int32)
+    passos = np.maximum(np.abs(segs[:, 2] - segs[:, 0]), np.abs(segs[:, 3] - segs[:, 1]))
+    longos = passos > PASSOS_MAX_LOTE
+    curtos = segs[~longos]
+    if not len(curtos):
+        return segs[longos]
+    x0, y0, x1, y1 = curtos.T
+    dx, dy = x1 - x0, y1 - y0
+    passos = passos[~longos]
+    qtd = passos + 1
+    # Amostra k = 0..passos de cada segmento, todas num vetor só
+    seg = np.repeat(np.arange(len(qtd), dtype=np.int32), qtd)
+    k = np.arange(len(seg), dtype=np.int64)
+    k -= np.repeat(np.cumsum(qtd) - qtd, qtd)
+    k = k.astype(np.float32)
+    div = np.maximum(passos, 1)
+    # Coordenadas >= 0: somar 0.5 e truncar arredonda
+    px = (dx / div).astype(np.float32)[seg]; px *= k; px += (x0 + np.float32(0.5))[seg]
+    py = (dy / div).astype(np.float32)[seg]; py *= k; py += (y0 + np.float32(0.5))[seg]
+    idx = px.astype(np.int32); idx *= h; idx += py.astype(np.int32)
+    mascara.reshape(-1)[idx] = True
+    return segs[longos]
+
+
+def marcar_circunferencias(mascara: np.ndarray, cx: np.ndarray, cy: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """Marca as circunferências (centro e raio inteiros) por simetria de oitantes.
+
+    Circunferências que não cruzam a máscara são ignoradas. Retorna a máscara
+    booleana das que têm raio acima de RAIO_MAX_LOTE e não foram marcadas.
+    """
+    w, h = mascara.shape
+    cx, cy, r = (np.asarray(v, dtype=np.intp) for v in (cx, cy, r))
+    # Cruza o retângulo se o ponto mais próximo está dentro do raio e o canto mais longe fora
+    perto = np.hypot(np.clip(cx, 0, w - 1) - cx, np.clip(cy, 0, h - 1) - cy)
+    longe = np.hypot(np.maximum(cx, w - 1 - cx), np.maximum(cy, h - 1 - cy))
+    cruza = (r >= 0) & (perto <= r + 1) & (longe >= r - 1)
+    grandes = cruza & (r > RAIO_MAX_LOTE)
+    sel = cruza & ~grandes
+    cx, cy, r = cx[sel], cy[sel], r[sel]
+    if not len(r):
+        return grandes
+    qtd = (r / np.sqrt(2)).astype(np.intp) + 1
+    c = np.repeat(np.arange(len(r)), qtd)
+    u = np.arange(len(c)) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    v = np.rint(np.sqrt(np.maximum(r[c] ** 2 - u ** 2, 0))).astype(np.intp)
+    xc, yc = cx[c], cy[c]
+    for a, b in ((u, v), (v, u)):
+        for sx in (1, -1):
+            for sy in (1, -1):
+                xs, ys = xc + sx * a, yc + sy * b
+                ok = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+                mascara[xs[ok], ys[ok]] = True
+    return grandes
+
+
+def dilatar(mascara: np.ndarray, raio: int) -> np.ndarray:
+    """Cada pixel marcado vira um quadrado de lado 2*raio+1 (recortado à máscara)."""
+    saida = mascara.copy()
+    for eixo in (0, 1):
+        base = saida.copy()
+        for d in range(1, raio + 1):
+            if eixo == 0:
+                saida[d:, :] |= base[:-d, :]; saida[:-d, :] |= base[d:, :]
+            else:
+                saida[:, d:] |= base[:, :-d]; saida[:, :-d] |= base[:, d:]
+    return saida
@@ -0,0 +1,136 @@
+"""
+Renderização da cena numa thread separada, com dois buffers fora da tela.
+
+A thread principal submete instantâneos imutáveis da cena e continua tratando
+eventos; a thread de desenho pinta o instantâneo mais recente no buffer de trás
+e, ao terminar, troca os buffers. A thread principal só copia (blit) o último
+quadro concluído, então a latência de entrada não depende do tamanho da cena.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import pygame as pg
+
+log = logging.getLogger("TP1_OOP_FULL")
+
+
+class RenderizadorAssincrono:
+    """
+    Desenha `desenhar(superficie, cena)` em segundo plano alternando entre dois
+    buffers. Cada buffer tem uma trava: a thread de desenho só escreve no buffer
+    de trás e a principal só lê o da frente enquanto segura a trava dele.
+    """
+    def __init__(self, tamanho, desenhar):
+        self.desenhar = desenhar
+        self.buffers = [pg.Surface(tamanho), pg.Surface(tamanho)]
+        self._travas = [threading.Lock(), threading.Lock()]
+        self._versoes = [None, None]  # versão da cena desenhada em cada buffer
+        self._frente = None           # índice do último buffer concluído
+        self._pendente = None         # (cena, versao) aguardando desenho
+        self._cond = threading.Condition()
+        self._rodando = True
+        self._erro = None             # exceção que encerrou a thread de desenho
+        self.quadros_desenhados = 0
+        self.tempo_desenho = 0.0      # s somados de todos os desenhos
+        self.tempo_desenho_max = 0.0
+        self._thread = threading.Thread(target=self._laco, name="renderizador", daemon=True)
+        self._thread.start()
+
+    def submeter(self, cena, versao):
+        """
+        Agenda o desenho de `cena`; um instantâneo ainda não desenhado é descartado.
+        """
+        with self._cond:
+            self._pendente = (cena, versao)
+            self._cond.notify()
+
+    @property
+    def versao_pronta(self):
+        with self._cond:
+            return None if self._frente is None else self._versoes[self._frente]
+
+    def aguardar(self, versao, timeout=None):
+        """
+        Bloqueia até existir um quadro concluído de `versao` ou posterior
+        (reprodução e medições). Retorna False se o tempo acabar antes e
+        relança a falha se a thread de desenho tiver morrido.
+        """
+        with self._cond:
+            pronto = self._cond.wait_for(
+                lambda: not self._rodando or (self._frente is not None and self._versoes[self._frente] >= versao),
+                timeout)
+            self._verificar_erro()
+            return pronto
+
+    def estatisticas(self):
+        """
+        Quadros desenhados e tempo de desenho (médio e máximo, em segundos).
+        """
+        with self._cond:
+            n = self.quadros_desenhados
+            return {"quadros": n, "desenho_medio_s": self.tempo_desenho / n if n else 0.0,
+                    "desenho_max_s": self.tempo_desenho_max}
+
+    @contextmanager
+    def quadro_pronto(self):
+        """
+        Entrega (superficie, versao) do último quadro concluído, ou (None, None)
+        se ainda não há nenhum. A superfície só pode ser usada dentro do bloco.
+        """
+        with self._cond:
+            self._verificar_erro()
+            i = self._frente
+            # A trava é tomada antes de soltar _cond: a thread de desenho escolhe
+            # o buffer de trás sob _cond, então não pode passar a escrever neste.
+            if i is not None:
+                self._travas[i].acquire()
+        if i is None:
+            yield None, None
+            return
+        try:
+            yield self.buffers[i], self._versoes[i]
+        finally:
+            self._travas[i].release()
+
+    def parar(self):
+        with self._cond:
+            self._rodando = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _verificar_erro(self):
+        # chamado com _cond tomada
+        if self._erro is not None:
+            raise RuntimeError("a thread de desenho falhou") from self._erro
+
+    def _laco(self):
+        while True:
+            with self._cond:
+                while self._rodando and self._pendente is None:
+                    self._cond.wait()
+                if not self._rodando:
+                    return
+                cena, versao = self._pendente
+                self._pendente = None
+                tras = 0 if self._frente != 0 else 1
+            try:
+                with self._travas[tras]:
+                    t0 = time.perf_counter()
+                    self.desenhar(self.buffers[tras], cena)
+                    dt = time.perf_counter() - t0
+                    self._versoes[tras] = versao
+            except Exception as e:
+                log.exception("Falha ao desenhar a versão %s da cena", versao)
+                with self._cond:
+                    self._erro = e
+                    self._rodando = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._frente = tras
+                self.quadros_desenhados += 1
+                self.tempo_desenho += dt
+                self.tempo_desenho_max = max(self.tempo_desenho_max, dt)
+                self._cond.notify_all()
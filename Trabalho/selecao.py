@@ -0,0 +1,141 @@
+"""
+Seleção por retângulo mantida ao vivo durante o arrasto.
+
+Os pontos da cena ficam numa grade uniforme. A cada movimento do mouse só as
+faixas que entraram ou saíram do retângulo (R1 \\ R0 e R0 \\ R1) são
+consultadas, com teste exato por ponto, e cada objeto mantém quantos dos seus
+pontos estão dentro: ele está completo quando a contagem chega ao total. O
+custo por movimento é proporcional às faixas, não ao tamanho da cena.
+
+Retângulos são tuplas (xmin, xmax, ymin, ymax) fechadas, em coordenadas do mundo.
+"""
+import math
+
+
+def diferenca_retangulos(a, b):
+    """
+    Retângulos que cobrem a \\ b (incluindo as bordas em comum; o teste exato fica com quem consulta).
+    """
+    if b is None:
+        return [a]
+    ax0, ax1, ay0, ay1 = a
+    bx0, bx1, by0, by1 = b
+    if bx0 > ax1 or bx1 < ax0 or by0 > ay1 or by1 < ay0:
+        return [a]
+    partes = []
+    if ax0 < bx0: partes.append((ax0, bx0, ay0, ay1))
+    if ax1 > bx1: partes.append((bx1, ax1, ay0, ay1))
+    x0, x1 = max(ax0, bx0), min(ax1, bx1)
+    if ay0 < by0: partes.append((x0, x1, ay0, by0))
+    if ay1 > by1: partes.append((x0, x1, by1, ay1))
+    return partes
+
+
+class GradeUniforme:
+    """
+    Índice espacial de pontos (xs[i], ys[i]) em células quadradas de lado `tam`.
+    """
+    def __init__(self, xs, ys, tam):
+        self.tam = tam
+        self.celulas = {}
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            self.celulas.setdefault((math.floor(x / tam), math.floor(y / tam)), []).append(i)
+        self.limites = None
+        if self.celulas:
+            cxs = [c for c, _ in self.celulas]; cys = [c for _, c in self.celulas]
+            self.limites = (min(cxs), max(cxs), min(cys), max(cys))
+
+    def consultar(self, xmin, xmax, ymin, ymax):
+        """
+        Índices dos pontos nas células que tocam o retângulo (um superconjunto dos pontos dentro dele).
+        """
+        if self.limites is None:
+            return
+        t = self.tam
+        c0 = max(math.floor(xmin / t), self.limites[0]); c1 = min(math.floor(xmax / t), self.limites[1])
+        l0 = max(math.floor(ymin / t), self.limites[2]); l1 = min(math.floor(ymax / t), self.limites[3])
+        if c0 > c1 or l0 > l1:
+            return
+        if (c1 - c0 + 1) * (l1 - l0 + 1) > len(self.celulas):
+            # Retângulo maior que a parte ocupada da grade: percorre só as células ocupadas
+            for (cx, cy), idx in self.celulas.items():
+                if c0 <= cx <= c1 and l0 <= cy <= l1:
+                    yield from idx
+            return
+        get = self.celulas.get
+        for cx in range(c0, c1 + 1):
+            for cy in range(l0, l1 + 1):
+                idx = get((cx, cy))
+                if idx:
+                    yield from idx
+
+
+class SelecaoIncremental:
+    """
+    Estado da seleção por retângulo sobre pontos fixos (xs, ys).
+    `grupos` são listas de índices de pontos (um grupo por objeto composto);
+    pontos fora de qualquer grupo são "soltos".
+    """
+    def __init__(self, xs, ys, grupos, tam_celula):
+        self.xs, self.ys = xs, ys
+        self.grade = GradeUniforme(xs, ys, tam_celula)
+        self.grupos = [list(dict.fromkeys(g)) for g in grupos]
+        self.grupos_do_ponto = [[] for _ in xs]
+        for k, g in enumerate(self.grupos):
+            for i in g:
+                self.grupos_do_ponto[i].append(k)
+        self.limpar()
+
+    def limpar(self):
+        """
+        Esvazia a seleção (início de um novo arrasto).
+        """
+        self.retangulo = None
+        self.dentro = bytearray(len(self.xs))
+        self.selecionados = set()                  # índices dos pontos dentro do retângulo
+        self.contagem = [0] * len(self.grupos)     # pontos de cada grupo dentro
+        self.completos = set()                     # grupos com todos os pontos dentro
+
+    def atualizar(self, retangulo):
+        """
+        Move a seleção para `retangulo` (ou None) e retorna os índices dos pontos que entraram ou saíram.
+        """
+        antes = self.retangulo
+        self.retangulo = retangulo
+        faixas = []
+        if retangulo is not None:
+            faixas += diferenca_retangulos(retangulo, antes)
+        if antes is not None:
+            faixas += diferenca_retangulos(antes, retangulo)
+        if retangulo is None:
+            xmin = xmax = ymin = ymax = None
+        else:
+            xmin, xmax, ymin, ymax = retangulo
+        xs, ys, dentro = self.xs, self.ys, self.dentro
+        mudaram = []
+        for faixa in faixas:
+            for i in self.grade.consultar(*faixa):
+                agora = xmin is not None and xmin <= xs[i] <= xmax and ymin <= ys[i] <= ymax
+                if agora != dentro[i]:
+                    dentro[i] = agora
+                    self._contar(i, 1 if agora else -1)
+                    mudaram.append(i)
+        return mudaram
+
+    def _contar(self, i, delta):
+        if delta > 0:
+            self.selecionados.add(i)
+        else:
+            self.selecionados.discard(i)
+        for k in self.grupos_do_ponto[i]:
+            self.contagem[k] += delta
+            if self.contagem[k] == len(self.grupos[k]):
+                self.completos.add(k)
+            else:
+                self.completos.discard(k)
+
+    def soltos_selecionados(self):
+        """
+        Pontos selecionados que não pertencem a nenhum grupo.
+        """
+        return [i for i in self.selecionados if not self.grupos_do_ponto[i]]
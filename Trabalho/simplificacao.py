@@ -0,0 +1,65 @@
+from typing import List, Sequence, Tuple
+
+Vec2 = Tuple[float, float]
+
+
+def filtro_radial(pontos: Sequence[Vec2], tolerancia: float) -> List[Vec2]:
+    """Descarta vértices a menos de `tolerancia` do último vértice mantido.
+
+    Passo linear que elimina os aglomerados de vértices que caem no mesmo
+    pixel antes do Douglas–Peucker. O primeiro e o último vértice são mantidos.
+    """
+    if len(pontos) < 3:
+        return list(pontos)
+    tol2 = tolerancia * tolerancia
+    lx, ly = pontos[0]
+    saida = [pontos[0]]
+    for x, y in pontos[1:-1]:
+        dx = x - lx; dy = y - ly
+        if dx * dx + dy * dy > tol2:
+            saida.append((x, y))
+            lx, ly = x, y
+    saida.append(pontos[-1])
+    return saida
+
+
+def douglas_peucker(pontos: Sequence[Vec2], tolerancia: float) -> List[Vec2]:
+    """Simplifica uma polilinha pelo algoritmo de Douglas–Peucker.
+
+    Versão iterativa (pilha explícita) para não estourar o limite de recursão
+    em contornos com dezenas de milhares de vértices.
+    """
+    n = len(pontos)
+    if n < 3:
+        return list(pontos)
+    tol2 = tolerancia * tolerancia
+    manter = bytearray(n)
+    manter[0] = manter[n - 1] = 1
+    pilha = [(0, n - 1)]
+    while pilha:
+        i, j = pilha.pop()
+        ax, ay = pontos[i]
+        bx, by = pontos[j]
+        vx, vy = bx - ax, by - ay
+        comp2 = vx * vx + vy * vy
+        pior, pior_d2 = -1, tol2
+        for k in range(i + 1, j):
+            px, py = pontos[k]
+            wx, wy = px - ax, py - ay
+            if comp2 == 0.0:
+                d2 = wx * wx + wy * wy
+            else:
+                cruz = wx * vy - wy * vx
+                d2 = cruz * cruz / comp2
+            if d2 > pior_d2:
+                pior, pior_d2 = k, d2
+        if pior >= 0:
+            manter[pior] = 1
+            pilha.append((i, pior))
+            pilha.append((pior, j))
+    return [p for p, m in zip(pontos, manter) if m]
+
+
+def simplificar(pontos: Sequence[Vec2], tolerancia: float) -> List[Vec2]:
+    """Filtro radial seguido de Douglas–Peucker com a mesma tolerância."""
+    return douglas_peucker(filtro_radial(pontos, tolerancia), tolerancia)
@@ -1,7 +1,8 @@
 from typing import Iterable, Tuple
 
 # Importamos as entidades para poder aplicar transformações
-from entities import Ponto, Reta, Circunferencia, Poligono
+from entities import Ponto
+from afim import Matriz, matriz_escala, matriz_rotacao, matriz_translacao
 
 
 class Transformacao:
@@ -13,9 +14,29 @@ class Transformacao:
     def aplicar(self):
         """Aplica a transformação nas entidades.
 
+        Retas, circunferências e polígonos só acumulam a matriz (O(1) por objeto;
+        os vértices são transformados no desenho ou em consolidar()). Pontos
+        avulsos e os de objetos com vértices compartilhados são movidos na hora,
+        cada ponto uma única vez.
+        """
+        m = self.matriz()
+        imediatos = {}  # dict como conjunto ordenado
+        for entidade in self.entidades:
+            if isinstance(entidade, Ponto):
+                imediatos[entidade] = None
+            elif entidade.compartilhado:
+                imediatos.update(dict.fromkeys(entidade.pontos()))
+            else:
+                entidade.transformar(m)
+        for p in imediatos:
+            p.transformar(m)
+
+    def matriz(self) -> Matriz:
+        """Matriz afim equivalente à transformação.
+
         Cada subclasse deve implementar este método.
         """
-        raise NotImplementedError("Subclasses devem implementar o método aplicar().")
+        raise NotImplementedError("Subclasses devem implementar o método matriz().")
 
 
 class Translacao(Transformacao):
@@ -26,10 +47,8 @@ class Translacao(Transformacao):
         self.dx = dx
         self.dy = dy
 
-    def aplicar(self):
-        for entidade in self.entidades:
-            # As entidades de entities.py implementam translate(dx, dy)
-            entidade.translate(self.dx, self.dy)
+    def matriz(self) -> Matriz:
+        return matriz_translacao(self.dx, self.dy)
 
 
 class Escala(Transformacao):
@@ -40,10 +59,8 @@ class Escala(Transformacao):
         self.fator = fator
         self.pivot = pivot
 
-    def aplicar(self):
-        for entidade in self.entidades:
-            # As entidades de entities.py implementam scale(fator, pivot)
-            entidade.scale(self.fator, self.pivot)
+    def matriz(self) -> Matriz:
+        return matriz_escala(self.fator, self.pivot)
 
 
 class Rotacao(Transformacao):
@@ -54,7 +71,5 @@ class Rotacao(Transformacao):
         self.angulo_graus = angulo_graus
         self.pivot = pivot
 
-    def aplicar(self):
-        for entidade in self.entidades:
-            # As entidades de entities.py implementam rotate(angle, pivot)
-            entidade.rotate(self.angulo_graus, self.pivot)
\ No newline at end of file
+    def matriz(self) -> Matriz:
+        return matriz_rotacao(self.angulo_graus, self.pivot)
@@ -0,0 +1,146 @@
+"""
+Verificação diferencial da rasterização por spans.
+
+Compara, para segmentos e circunferências aleatórios (inclusive parcialmente
+fora da superfície), os pixels escritos pelos rasterizadores originais com
+set_at pixel a pixel contra os spans de rasterizacao.py desenhados em bloco.
+Também confere o teste de acerto contem_pixel contra os pixels de referência.
+
+Uso: python verificar_rasterizacao.py [n_casos] [semente]
+"""
+import math
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame as pg
+
+from rasterizacao import (contem_pixel, desenhar_spans, recortar_spans, spans_bresenham,
+                          spans_circunferencia, spans_dda)
+
+LARGURA, ALTURA = 160, 120
+COR = (0, 0, 0)
+
+
+# -------------------------
+# Referência: rasterizadores originais (set_at por pixel)
+# -------------------------
+def ref_dda(surface, x0, y0, x1, y1, color):
+    x0_f, y0_f = float(x0), float(y0)
+    x1_f, y1_f = float(x1), float(y1)
+    dx, dy = x1_f - x0_f, y1_f - y0_f
+    steps = int(max(abs(dx), abs(dy)))
+    if steps == 0:
+        if 0 <= x0 < surface.get_width() and 0 <= y0 < surface.get_height():
+            surface.set_at((x0, y0), color)
+        return
+    inc_x, inc_y = dx / steps, dy / steps
+    x, y = x0_f, y0_f
+    for _ in range(steps + 1):
+        xi, yi = int(round(x)), int(round(y))
+        if 0 <= xi < surface.get_width() and 0 <= yi < surface.get_height():
+            surface.set_at((xi, yi), color)
+        x += inc_x; y += inc_y
+
+
+def ref_bresenham(surface, x0, y0, x1, y1, color):
+    x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    if steep: x0, y0, x1, y1 = y0, x0, y1, x1
+    if x0 > x1: x0, x1, y0, y1 = x1, x0, y1, y0
+    dx = x1 - x0; dy = abs(y1 - y0)
+    err = dx // 2; y_step = 1 if y0 < y1 else -1; y = y0
+    for x in range(x0, x1 + 1):
+        if steep:
+            if 0 <= y < surface.get_width() and 0 <= x < surface.get_height():
+                surface.set_at((y, x), color)
+        else:
+            if 0 <= x < surface.get_width() and 0 <= y < surface.get_height():
+                surface.set_at((x, y), color)
+        err -= dy
+        if err < 0:
+            y += y_step; err += dx
+
+
+def ref_circunferencia(surface, cx, cy, r, color):
+    if r <= 0:
+        return
+    x, y = 0, r
+    p = 1 - r
+
+    def plot8(xc, yc, x_, y_):
+        pts = [(xc + x_, yc + y_), (xc - x_, yc + y_), (xc + x_, yc - y_), (xc - x_, yc - y_),
+               (xc + y_, yc + x_), (xc - y_, yc + x_), (xc + y_, yc - x_), (xc - y_, yc - x_)]
+        w, h = surface.get_width(), surface.get_height()
+        for px, py in pts:
+            if 0 <= px < w and 0 <= py < h:
+                surface.set_at((int(px), int(py)), color)
+
+    plot8(cx, cy, x, y)
+    while x < y:
+        x += 1
+        if p < 0:
+            p += 2 * x + 1
+        else:
+            y -= 1
+            p += 2 * (x - y) + 1
+        plot8(cx, cy, x, y)
+
+
+# -------------------------
+# Comparação
+# -------------------------
+def _pixels_pintados(surface):
+    return {(x, y) for x in range(surface.get_width()) for y in range(surface.get_height())
+            if surface.get_at((x, y))[:3] == COR}
+
+
+def _comparar(desenho_ref, spans):
+    ref = pg.Surface((LARGURA, ALTURA)); ref.fill((255, 255, 255))
+    desenho_ref(ref)
+    novo = pg.Surface((LARGURA, ALTURA)); novo.fill((255, 255, 255))
+    desenhar_spans(novo, spans, COR)
+    esperado = _pixels_pintados(ref)
+    if esperado != _pixels_pintados(novo):
+        return False
+    visiveis = recortar_spans(spans, LARGURA, ALTURA)
+    return all(contem_pixel(visiveis, x, y) == ((x, y) in esperado)
+               for x in range(LARGURA) for y in range(ALTURA))
+
+
+def _coord(rnd):
+    # Maioria dentro da superfície, alguns bem fora para exercitar o recorte
+    return rnd.randint(-LARGURA // 2, LARGURA + LARGURA // 2), rnd.randint(-ALTURA // 2, ALTURA + ALTURA // 2)
+
+
+def verificar(n_casos=200, semente=0):
+    """
+    Roda n_casos segmentos (DDA e Bresenham) e circunferências aleatórios.
+    Retorna a lista de casos divergentes (vazia se tudo confere).
+    """
+    rnd = random.Random(semente)
+    falhas = []
+    for _ in range(n_casos):
+        (x0, y0), (x1, y1) = _coord(rnd), _coord(rnd)
+        if rnd.random() < 0.1:
+            x1, y1 = x0, y0
+        if not _comparar(lambda s: ref_dda(s, x0, y0, x1, y1, COR), spans_dda(x0, y0, x1, y1)):
+            falhas.append(("DDA", x0, y0, x1, y1))
+        if not _comparar(lambda s: ref_bresenham(s, x0, y0, x1, y1, COR), spans_bresenham(x0, y0, x1, y1)):
+            falhas.append(("BRESENHAM", x0, y0, x1, y1))
+        (cx, cy), r = _coord(rnd), rnd.randint(0, int(math.hypot(LARGURA, ALTURA)))
+        if not _comparar(lambda s: ref_circunferencia(s, cx, cy, r, COR), spans_circunferencia(cx, cy, r)):
+            falhas.append(("CIRCUNF", cx, cy, r))
+    return falhas
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    semente = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    pg.init()
+    falhas = verificar(n, semente)
+    for f in falhas:
+        print("DIVERGENTE:", f)
+    print(f"{3 * n - len(falhas)}/{3 * n} casos idênticos")
+    sys.exit(1 if falhas else 0)